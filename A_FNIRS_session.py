@@ -4,6 +4,15 @@ import time
 import subprocess
 import os
 import csv
+import render_backend
+import session_timeline
+import snirf_events
+import lab_station
+import gc_control
+import realtime_mode
+import sampling_profiler
+import clock_sync
+import session_checkpoint
 
 # Paths to individual game scripts
 codes_dir = os.path.dirname(os.path.abspath(__file__))
@@ -11,11 +20,22 @@ oneback_script = os.path.join(codes_dir, 'oneback_game.py')
 threeback_script = os.path.join(codes_dir, 'threeback_game.py')
 balloon_test2_script = os.path.join(codes_dir, 'red_balloon_shoot_game.py')
 
-# Prompt for participant ID once
-try:
-    participant_id = input("Enter participant ID: ")
-except Exception:
-    participant_id = 'P01'
+# One entry per task, in this session's order:
+# (task, script, countdown title, rating prompt, name in the frustration file)
+TASK_BLOCKS = [
+    ("1-back", oneback_script, "1-Back Test", "1-back Test", "1-back"),
+    ("3-back", threeback_script, "3-Back Test", "3-back Test", "3-back"),
+    ("balloon", balloon_test2_script, "Balloon Game", "Balloon Game", "Balloon"),
+]
+
+# Participant ID comes from the station launcher if given, otherwise prompt once;
+# --resume continues an interrupted session from its checkpoint
+participant_id, resume = session_checkpoint.parse_args(sys.argv[1:])
+if participant_id is None:
+    try:
+        participant_id = input("Enter participant ID: ")
+    except Exception:
+        participant_id = 'P01'
 
 # Shared settings
 FPS = 60
@@ -35,59 +55,68 @@ FONT_MEDIUM = None
 frustration_folder = r"C:\\Users\\HP\\OneDrive\\Desktop\\Mendi_vs_Octamon_Study\\Frustration_Ratings"
 os.makedirs(frustration_folder, exist_ok=True)
 frustration_file = os.path.join(frustration_folder, f"{participant_id}_frustration_rating.csv")
-
-
-def show_fixation(screen, clock, duration_ms):
+if resume:
+    session_checkpoint.hand_over(participant_id, "A", lab_station.SESSION_SCRIPTS)
+checkpoint = session_checkpoint.Checkpoint(participant_id, "A", [block[0] for block in TASK_BLOCKS], resume)
+checkpoint.set_session_zero(*clock_sync.start_session(*checkpoint.session_zero()))
+snirf_path = snirf_events.start_session(participant_id)
+station = lab_station.connect_from_env(participant_id)
+timeline = session_timeline.Timeline(participant_id, "A", snirf_path=snirf_path, station=station)
+# tasks list the files they write here (see session_manifest.py)
+os.environ["MVO_MANIFEST"] = timeline.manifest_path
+os.environ["MVO_RT_REPORT"] = os.path.join(os.path.dirname(timeline.manifest_path), f"{participant_id}_realtime.jsonl")
+# background helpers, started in main() and shut down by close_session()
+profiler = sync = None
+
+
+def show_fixation(display, clock, duration_ms):
+    # nothing is timed against the fixation cross, so collect garbage here
+    gc_control.collect()
     start = pygame.time.get_ticks()
     while pygame.time.get_ticks() - start < duration_ms:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-        screen.fill(BLACK)
+                quit_session()
+        display.clear(BLACK)
         cx, cy = WIDTH // 2, HEIGHT // 2
         size = 20
-        pygame.draw.line(screen, WHITE, (cx - size, cy), (cx + size, cy), 2)
-        pygame.draw.line(screen, WHITE, (cx, cy - size), (cx, cy + size), 2)
-        pygame.display.flip()
+        display.line(WHITE, (cx - size, cy), (cx + size, cy), 2)
+        display.line(WHITE, (cx, cy - size), (cx, cy + size), 2)
+        display.present()
         clock.tick(FPS)
 
 
-def show_countdown(screen, clock, label):
+def show_countdown(display, clock, label):
     for i in range(COUNTDOWN_START, 0, -1):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-        screen.fill(BLACK)
+                quit_session()
+        display.clear(BLACK)
         text = f"{label} starting in {i}..."
-        render = FONT.render(text, True, WHITE)
-        rect = render.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-        screen.blit(render, rect)
-        pygame.display.flip()
+        display.text(text, FONT, WHITE, (WIDTH // 2, HEIGHT // 2))
+        display.present()
         time.sleep(1)
 
 
-def show_instructions(screen, clock, duration_ms):
+def show_instructions(display, clock, duration_ms):
     start = pygame.time.get_ticks()
     while pygame.time.get_ticks() - start < duration_ms:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
-        screen.fill(BLACK)
+                quit_session()
+        display.clear(BLACK)
         instr_text = "Please focus on '+' shown on the screen "
-        instr_render = FONT.render(instr_text, True, WHITE)
-        instr_rect = instr_render.get_rect(center=(WIDTH // 2, HEIGHT // 2))
-        screen.blit(instr_render, instr_rect)
-        pygame.display.flip()
+        display.text(instr_text, FONT, WHITE, (WIDTH // 2, HEIGHT // 2))
+        display.present()
         clock.tick(FPS)
 
 
 def init_screen():
     pygame.init()
     # Full screen mode
-    screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    display = render_backend.open_display("Combined Session")
     global WIDTH, HEIGHT
-    WIDTH, HEIGHT = screen.get_size()
-    pygame.display.set_caption("Combined Session")
+    WIDTH, HEIGHT = display.size
     clock = pygame.time.Clock()
     global FONT, FONT_BIG, FONT_SMALL, FONT_MEDIUM
     try:
@@ -100,17 +129,18 @@ def init_screen():
         FONT_BIG = pygame.font.SysFont("arial", 90)
         FONT_MEDIUM = pygame.font.SysFont("arial", 50)
         FONT_SMALL = pygame.font.SysFont("arial", 40)
-    return screen, clock
+    return display, clock
 
 
-def get_frustration_rating(screen, clock, task_name):
+def get_frustration_rating(display, clock, task_name):
+    gc_control.collect()
     input_text = ""
     rating = None
 
     while rating is None:
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit(); sys.exit()
+                quit_session()
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_RETURN:
                     try:
@@ -128,12 +158,10 @@ def get_frustration_rating(screen, clock, task_name):
                         input_text += event.unicode
 
         # Clear screen
-        screen.fill(BLACK)
+        display.clear(BLACK)
 
         # Main big purple question
-        big_question = FONT_BIG.render("How frustrated are you feeling?", True, PURPLE)
-        rect = big_question.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 180))
-        screen.blit(big_question, rect)
+        display.text("How frustrated are you feeling?", FONT_BIG, PURPLE, (WIDTH // 2, HEIGHT // 2 - 180))
 
         # Slightly bigger white supporting text
         medium_lines = [
@@ -142,23 +170,17 @@ def get_frustration_rating(screen, clock, task_name):
         ]
         y = HEIGHT // 2 - 20
         for line in medium_lines:
-            render = FONT_MEDIUM.render(line, True, WHITE)
-            rect = render.get_rect(center=(WIDTH // 2, y))
-            screen.blit(render, rect)
+            display.text(line, FONT_MEDIUM, WHITE, (WIDTH // 2, y))
             y += 70
 
         # Show input label and value in purple
         y += 60
-        input_label = FONT_MEDIUM.render("Your input:", True, PURPLE)
-        rect_label = input_label.get_rect(center=(WIDTH // 2, y))
-        screen.blit(input_label, rect_label)
+        display.text("Your input:", FONT_MEDIUM, PURPLE, (WIDTH // 2, y))
 
         y += 70
-        input_display = FONT_BIG.render(input_text if input_text else "", True, PURPLE)
-        rect_display = input_display.get_rect(center=(WIDTH // 2, y))
-        screen.blit(input_display, rect_display)
+        display.text(input_text if input_text else "", FONT_BIG, PURPLE, (WIDTH // 2, y))
 
-        pygame.display.flip()
+        display.present()
         clock.tick(FPS)
 
     return rating
@@ -171,52 +193,97 @@ def save_frustration(participant_id, task_name, rating):
         if new_file:
             writer.writerow(["participant_id", "task_name", "frustration"])
         writer.writerow([participant_id, task_name, rating])
+    snirf_events.append_events(snirf_path, participant_id, "frustration", [[time.time(), 0, rating]])
+    if station:
+        station.send("frustration", task=task_name, rating=rating)
     print(f"⭐ Saved frustration rating for {task_name}: {rating} to {frustration_file}")
 
 
-def main():
-    # 1-Back Test
-    screen, clock = init_screen()
-    show_instructions(screen, clock, 6000)
-    show_fixation(screen, clock, FIXATION_MS)
-    show_countdown(screen, clock, "1-Back Test")
-    pygame.quit()
-    subprocess.run([sys.executable, oneback_script, participant_id], check=True)
+def close_session(profiler, sync):
+    if station:
+        station.close()
+    if sync:
+        sync.stop()
+    if profiler:
+        profiler.stop()
 
-    # Prompt frustration after 1-back
-    screen, clock = init_screen()
-    frust1 = get_frustration_rating(screen, clock, "1-back Test")
-    save_frustration(participant_id, "1-back", frust1)
 
-    # 3-Back Test
-    show_instructions(screen, clock, 6000)
-    show_fixation(screen, clock, FIXATION_MS)
-    show_countdown(screen, clock, "3-Back Test")
+def quit_session():
+    # window closed mid-session: stop the helpers (and flush their files) before leaving
     pygame.quit()
-    subprocess.run([sys.executable, threeback_script, participant_id], check=True)
-
-    # Prompt frustration after 3-back
-    screen, clock = init_screen()
-    frust3 = get_frustration_rating(screen, clock, "3-back Test")
-    save_frustration(participant_id, "3-back", frust3)
+    close_session(profiler, sync)
+    print(f"⏹️ Session stopped. Continue with:\n"
+          f"   python {os.path.basename(__file__)} {participant_id} {session_checkpoint.RESUME_FLAG}")
+    sys.exit()
+
+
+def start_report():
+    # per-participant report, built detached so the next participant can start straight away
+    if os.environ.get("MVO_REPORT", "1") != "1":
+        return
+    log = open(os.path.join(os.path.dirname(timeline.path), f"{participant_id}_report.log"), "w")
+    if os.name == "nt":
+        detach = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+    else:
+        detach = {"start_new_session": True}
+    subprocess.Popen([sys.executable, "-m", "analysis.report", participant_id, "--ratings-dir", frustration_folder],
+                     cwd=os.path.dirname(os.path.abspath(__file__)), stdout=log, stderr=subprocess.STDOUT,
+                     stdin=subprocess.DEVNULL, **detach)
+    log.close()
+    print(f"📊 Building the session report in the background (log: {log.name})")
 
-    # Balloon Test
-    show_instructions(screen, clock, 6000)
-    show_fixation(screen, clock, FIXATION_MS)
-    show_countdown(screen, clock, "Balloon Game")
-    pygame.quit()
-    subprocess.run([sys.executable, balloon_test2_script, participant_id], check=True)
 
-    # Prompt frustration after Balloon
-    screen, clock = init_screen()
-    frust_balloon = get_frustration_rating(screen, clock, "Balloon Game")
-    save_frustration(participant_id, "Balloon", frust_balloon)
+def main():
+    global profiler, sync
+    profiler = sampling_profiler.start(os.path.join(os.path.dirname(timeline.path), f"{participant_id}_session_A"))
+    sync = clock_sync.start(participant_id, os.path.dirname(timeline.path))
+    realtime_mode.enable("session A", schedule=False)
+    gc_control.after_setup()
+    display, clock = init_screen()
+    for task, script, title, rating_prompt, rating_name in TASK_BLOCKS:
+        if checkpoint.done(f"{task}:rating"):
+            continue
+        if not checkpoint.done(f"{task}:task"):
+            with timeline.block("instructions", task):
+                show_instructions(display, clock, 6000)
+            with timeline.block("fixation", task):
+                show_fixation(display, clock, FIXATION_MS)
+            with timeline.block("countdown", task):
+                show_countdown(display, clock, title)
+            pygame.quit()
+            failed = None
+            # a failed run leaves no task block behind, so a resumed task has a single epoch
+            try:
+                with timeline.block("task", task):
+                    subprocess.run([sys.executable, script, participant_id], check=True)
+            except subprocess.CalledProcessError as e:
+                failed = e
+            if failed:
+                checkpoint.failed(task, failed.returncode)
+                print(f"❌ {task} exited with code {failed.returncode}. Progress is saved; continue with:\n"
+                      f"   python {os.path.basename(__file__)} {participant_id} {session_checkpoint.RESUME_FLAG}")
+                close_session(profiler, sync)
+                sys.exit(failed.returncode)
+            checkpoint.task_done(task, timeline.manifest_path)
+            if station:
+                lab_station.send_task_outputs(station, timeline.manifest_path, task)
+            display, clock = init_screen()
+
+        # Prompt frustration after each task
+        with timeline.block("rating", task):
+            rating = get_frustration_rating(display, clock, rating_prompt)
+        save_frustration(participant_id, rating_name, rating)
+        checkpoint.rating_done(task, rating)
 
     # Final Fixation
-    show_instructions(screen, clock, 6000)
-    show_fixation(screen, clock, FIXATION_MS)
+    with timeline.block("instructions", "final"):
+        show_instructions(display, clock, 6000)
+    with timeline.block("fixation", "final"):
+        show_fixation(display, clock, FIXATION_MS)
     pygame.quit()
-
+    checkpoint.finish()
+    close_session(profiler, sync)
+    start_report()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,9 @@
+from .loading import STUDY_DIR, find_results, load_nback, load_balloon
+from .nback import score_blocks, sdt, rt_summary
+from .balloon import interval_curves, cohort_curve
+
+__all__ = [
+    "STUDY_DIR", "find_results", "load_nback", "load_balloon",
+    "score_blocks", "sdt", "rt_summary",
+    "interval_curves", "cohort_curve",
+]
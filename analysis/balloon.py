@@ -0,0 +1,33 @@
+import warnings
+import numpy as np
+
+
+def interval_curves(data):
+    # Per-block curves over the 11 s intervals; line position is normalised to
+    # the 0..1 travel range so different screen sizes are comparable.
+    spawned = data["spawned"]
+    hits = data["hits"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = np.where(spawned > 0, hits / spawned, np.nan)
+        line_pos = data["line_pos_pixels"] / data["range_pixels"]
+    rt = np.where(hits > 0, data["avg_reaction_ms"], np.nan)
+    return {
+        "participants": data["participants"],
+        "interval_start_s": data["interval_start_s"],
+        "hit_rate": hit_rate,
+        "avg_reaction_ms": rt,
+        "line_pos": line_pos,
+        "total_hit_rate": np.nansum(hits, axis=1) / np.maximum(np.nansum(spawned, axis=1), 1),
+    }
+
+
+def cohort_curve(values):
+    # mean and standard error across blocks, ignoring missing intervals
+    values = np.asarray(values, dtype=np.float64)
+    n = np.sum(~np.isnan(values), axis=0)
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        # all-missing intervals come back as NaN rather than a warning
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(values, axis=0)
+        sem = np.nanstd(values, axis=0, ddof=1) / np.sqrt(n)
+    return mean, sem, n
@@ -0,0 +1,85 @@
+import os
+import re
+import csv
+import glob
+import numpy as np
+
+STUDY_DIR = os.path.join(os.path.expanduser("~"), "OneDrive", "Desktop", "Mendi_vs_Octamon_Study")
+TASK_FOLDERS = {
+    "1-back": ("One_back_performance", "*_1-back_performance*_trials.csv"),
+    "3-back": ("Three_back_performance", "*_3-back_performance*_trials.csv"),
+    "balloon": ("Balloon_performance", "*_balloon_performance*.csv"),
+}
+WARMUP_TRIALS = {"1-back": 1, "3-back": 3}
+PARTICIPANT_RE = re.compile(r"^(.*?)_(?:1-back|3-back|balloon)_performance")
+
+
+def find_results(task, study_dir=STUDY_DIR):
+    folder, pattern = TASK_FOLDERS[task]
+    paths = sorted(glob.glob(os.path.join(study_dir, folder, pattern)))
+    if task == "balloon":
+        # the balloon folder also holds traces/recordings written alongside the summary
+        paths = [p for p in paths if re.search(r"_performance(_v\d+)?\.csv$", p)]
+    return paths
+
+
+def participant_of(path):
+    m = PARTICIPANT_RE.match(os.path.basename(path))
+    return m.group(1) if m else os.path.basename(path)
+
+
+def _int_or(value, default):
+    return int(value) if value != "" else default
+
+
+def load_nback(task, paths=None, study_dir=STUDY_DIR):
+    # One block per trial log; every column is a flat array over all trials of
+    # all blocks, with `block` indexing into `participants`/`paths`.
+    if paths is None:
+        paths = find_results(task, study_dir)
+    block, trial, is_match, response, rt, stim_ms = [], [], [], [], [], []
+    for b, path in enumerate(paths):
+        with open(path, newline="") as f:
+            for row in csv.DictReader(f):
+                block.append(b)
+                trial.append(int(row["trial"]))
+                is_match.append(int(row["is_match"]))
+                # -1 = no response, 0 = NO MATCH, 1 = MATCH
+                response.append(_int_or(row["response"], -1))
+                rt.append(float(row["reaction_time_ms"]) if row["reaction_time_ms"] != "" else np.nan)
+                stim_ms.append(float(row["stimulus_ms"]) if row["stimulus_ms"] != "" else np.nan)
+    trial = np.asarray(trial, dtype=np.int32)
+    return {
+        "task": task,
+        "paths": list(paths),
+        "participants": [participant_of(p) for p in paths],
+        "block": np.asarray(block, dtype=np.int32),
+        "trial": trial,
+        "scored": trial >= WARMUP_TRIALS[task],
+        "is_match": np.asarray(is_match, dtype=bool),
+        "response": np.asarray(response, dtype=np.int8),
+        "rt": np.asarray(rt, dtype=np.float64),
+        "stimulus_ms": np.asarray(stim_ms, dtype=np.float64),
+    }
+
+
+def load_balloon(paths=None, study_dir=STUDY_DIR):
+    # Balloon summaries are fixed-length interval tables, so they stack into
+    # (blocks, intervals) matrices.
+    if paths is None:
+        paths = find_results("balloon", study_dir)
+    columns = ("interval_start_s", "spawned", "hits", "misses", "avg_reaction_ms", "range_pixels", "line_pos_pixels")
+    tables = []
+    for path in paths:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+        tables.append([[float(r[c]) for c in columns] for r in rows])
+    n_intervals = max((len(t) for t in tables), default=0)
+    data = np.full((len(tables), n_intervals, len(columns)), np.nan)
+    for i, t in enumerate(tables):
+        if t:
+            data[i, :len(t)] = t
+    out = {"paths": list(paths), "participants": [participant_of(p) for p in paths]}
+    for j, name in enumerate(columns):
+        out[name] = data[:, :, j]
+    return out
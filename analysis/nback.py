@@ -0,0 +1,106 @@
+import numpy as np
+
+# Acklam's rational approximation of the inverse normal CDF (relative error
+# < 1.2e-9), evaluated on whole arrays: central region plus two tails.
+_A = (-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+      1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00)
+_B = (-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+      6.680131188771972e+01, -1.328068155288572e+01)
+_C = (-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+      -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00)
+_D = (7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00, 3.754408661907416e+00)
+_P_LOW = 0.02425
+
+
+def _poly(coefs, x):
+    out = np.zeros_like(x)
+    for c in coefs:
+        out = out * x + c
+    return out
+
+
+def _probit(p):
+    p = np.asarray(p, dtype=np.float64)
+    z = np.full(p.shape, np.nan)
+    low = (p > 0) & (p < _P_LOW)
+    high = (p < 1) & (p > 1 - _P_LOW)
+    mid = (p >= _P_LOW) & (p <= 1 - _P_LOW)
+    q = p[mid] - 0.5
+    r = q * q
+    z[mid] = _poly(_A, r) * q / (_poly(_B, r) * r + 1)
+    for mask, sign, tail in ((low, 1.0, p[low]), (high, -1.0, 1 - p[high])):
+        t = np.sqrt(-2 * np.log(tail))
+        z[mask] = sign * _poly(_C, t) / (_poly(_D, t) * t + 1)
+    z[p == 0] = -np.inf
+    z[p == 1] = np.inf
+    return z
+
+
+def _count(block, mask, n_blocks):
+    return np.bincount(block[mask], minlength=n_blocks)
+
+
+def score_blocks(data):
+    # Signal-detection counts per block. A "yes" is a MATCH press and a "no"
+    # a NO MATCH press; omissions are neither, so they stay out of the SDT
+    # cells and are reported on their own.
+    n_blocks = len(data["paths"])
+    scored = data["scored"]
+    block = data["block"]
+    target = data["is_match"]
+    yes = data["response"] == 1
+    no = data["response"] == 0
+    omitted = data["response"] == -1
+    out = {
+        "participants": data["participants"],
+        "hits": _count(block, scored & target & yes, n_blocks),
+        "misses": _count(block, scored & target & no, n_blocks),
+        "false_alarms": _count(block, scored & ~target & yes, n_blocks),
+        "correct_rejections": _count(block, scored & ~target & no, n_blocks),
+        "omissions": _count(block, scored & omitted, n_blocks),
+    }
+    out.update(sdt(out["hits"], out["misses"], out["false_alarms"], out["correct_rejections"]))
+    out.update(rt_summary(data))
+    return out
+
+
+def sdt(hits, misses, false_alarms, correct_rejections):
+    hits = np.asarray(hits, dtype=np.float64)
+    fas = np.asarray(false_alarms, dtype=np.float64)
+    n_signal = hits + np.asarray(misses, dtype=np.float64)
+    n_noise = fas + np.asarray(correct_rejections, dtype=np.float64)
+    # log-linear correction keeps z finite for perfect or empty cells; the
+    # reported rates are the raw ones
+    z_hit = _probit((hits + 0.5) / (n_signal + 1.0))
+    z_fa = _probit((fas + 0.5) / (n_noise + 1.0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        hit_rate = hits / n_signal
+        fa_rate = fas / n_noise
+    return {
+        "hit_rate": hit_rate,
+        "fa_rate": fa_rate,
+        "d_prime": z_hit - z_fa,
+        "criterion": -0.5 * (z_hit + z_fa),
+    }
+
+
+def rt_summary(data, quantiles=(0.1, 0.25, 0.5, 0.75, 0.9)):
+    n_blocks = len(data["paths"])
+    keep = data["scored"] & (data["response"] >= 0) & ~np.isnan(data["rt"])
+    block = data["block"][keep]
+    rt = data["rt"][keep]
+    n = np.bincount(block, minlength=n_blocks)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.bincount(block, weights=rt, minlength=n_blocks) / n
+    # sort once by (block, rt); each block's quantiles are then plain index lookups
+    order = np.lexsort((rt, block))
+    rt_sorted = rt[order]
+    starts = np.cumsum(n) - n
+    out = {"rt_n": n, "rt_mean": mean}
+    for q in quantiles:
+        pos = starts + np.clip(np.round(q * (n - 1)).astype(np.int64), 0, None)
+        vals = np.full(n_blocks, np.nan)
+        has = n > 0
+        vals[has] = rt_sorted[pos[has]]
+        out[f"rt_q{int(round(q * 100)):02d}"] = vals
+    return out
@@ -0,0 +1,287 @@
+import os
+import csv
+import sys
+import json
+import html
+import hashlib
+import argparse
+import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .loading import STUDY_DIR, find_results, participant_of, load_nback, load_balloon
+from .nback import score_blocks
+from .balloon import interval_curves, cohort_curve
+
+# Per-participant HTML reports under <study>/Reports/<pid>/. Figures are
+# rendered by a process pool (matplotlib is optional; without it the report
+# has tables only) and cached by a hash of their input files, so a cohort
+# rebuild only re-renders participants whose outputs changed. The session
+# runners start `python -m analysis.report <pid>` detached when a session ends.
+REPORT_DIR = os.path.join(STUDY_DIR, "Reports")
+REPORT_VERSION = "3"   # bump to invalidate every cached figure
+HAVE_MATPLOTLIB = importlib.util.find_spec("matplotlib") is not None
+NBACK_TASKS = ("1-back", "3-back")
+TITLES = {"accuracy": "n-back accuracy", "rt": "n-back reaction times", "balloon": "balloon intervals",
+          "ratings": "frustration ratings", "cohort_balloon": "balloon intervals, all participants"}
+
+
+def session_inputs(participant_id, study_dir=STUDY_DIR, ratings_dir=None):
+    # the session manifest names the exact files; older sessions fall back to the newest matching result
+    inputs = {}
+    manifest = os.path.join(study_dir, "Session_Timelines", f"{participant_id}_manifest.jsonl")
+    if os.path.exists(manifest):
+        with open(manifest) as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    path = entry.get("trials") or entry.get("summary")
+                    if path and os.path.exists(path):
+                        inputs[entry["task"]] = path
+    for task in (*NBACK_TASKS, "balloon"):
+        if task not in inputs:
+            found = [p for p in find_results(task, study_dir) if participant_of(p) == participant_id]
+            if found:
+                inputs[task] = found[-1]
+    ratings_dir = ratings_dir or os.path.join(study_dir, "Frustration_Ratings")
+    ratings = os.path.join(ratings_dir, f"{participant_id}_frustration_rating.csv")
+    if os.path.exists(ratings):
+        inputs["ratings"] = ratings
+    return inputs
+
+
+def file_hash(paths):
+    h = hashlib.sha256(REPORT_VERSION.encode())
+    for path in paths:
+        h.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def load_ratings(path):
+    with open(path, newline="") as f:
+        return [(r["task_name"], float(r["frustration"])) for r in csv.DictReader(f)]
+
+
+def _mean(values):
+    # None rather than NaN so summary.json stays valid JSON
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if len(values) else None
+
+
+def accuracy(scores):
+    # correct answers over every scored trial; omissions count as wrong
+    scored = sum(scores[k] for k in ("hits", "misses", "false_alarms", "correct_rejections", "omissions"))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (scores["hits"] + scores["correct_rejections"]) / scored
+
+
+def summarize(inputs):
+    summary = {}
+    for task in NBACK_TASKS:
+        if task in inputs:
+            s = score_blocks(load_nback(task, [inputs[task]]))
+            s["accuracy"] = accuracy(s)
+            summary[task] = {k: None if np.isnan(v[0]) else float(v[0]) for k, v in s.items() if k != "participants"}
+    if "balloon" in inputs:
+        c = interval_curves(load_balloon([inputs["balloon"]]))
+        summary["balloon"] = {"total_hit_rate": float(c["total_hit_rate"][0]),
+                              "mean_line_pos": _mean(c["line_pos"][0]),
+                              "mean_reaction_ms": _mean(c["avg_reaction_ms"][0])}
+    if "ratings" in inputs:
+        summary["ratings"] = dict(load_ratings(inputs["ratings"]))
+    return summary
+
+
+def render_figure(job):
+    # runs in a pool worker; one figure per job
+    kind, inputs, out_path = job
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    fig, ax = plt.subplots(figsize=(6, 3.5), dpi=110)
+    if kind == "accuracy":
+        tasks = [t for t in NBACK_TASKS if t in inputs]
+        scores = [score_blocks(load_nback(t, [inputs[t]])) for t in tasks]
+        x = np.arange(len(tasks))
+        for s in scores:
+            s["accuracy"] = accuracy(s)
+        bars = (("accuracy", "accuracy"), ("hit_rate", "hit rate"), ("fa_rate", "false-alarm rate"))
+        for i, (key, label) in enumerate(bars):
+            ax.bar(x + (i - 1) * 0.27, [s[key][0] for s in scores], 0.27, label=label)
+        for xi, s in zip(x, scores):
+            ax.annotate(f"d′ {s['d_prime'][0]:.2f}", (xi, 1.02), ha="center")
+        ax.set_xticks(x, tasks)
+        ax.set_ylim(0, 1.15)
+        ax.legend(loc="upper center", bbox_to_anchor=(0.5, -0.1), ncol=3)
+    elif kind == "rt":
+        for t in NBACK_TASKS:
+            if t in inputs:
+                d = load_nback(t, [inputs[t]])
+                rt = d["rt"][d["scored"] & ~np.isnan(d["rt"])]
+                ax.hist(rt, bins=20, range=(0, 2000), alpha=0.6, label=f"{t} (n={len(rt)})")
+        ax.set_xlabel("reaction time (ms)")
+        ax.legend()
+    elif kind == "balloon":
+        c = interval_curves(load_balloon([inputs["balloon"]]))
+        t = c["interval_start_s"][0]
+        ax.plot(t, c["hit_rate"][0], marker="o", label="hit rate")
+        ax.plot(t, c["line_pos"][0], marker="s", label="line position (0-1)")
+        ax.set_xlabel("interval start (s)")
+        ax.set_ylim(-0.05, 1.05)
+        ax.legend()
+    elif kind == "ratings":
+        ratings = load_ratings(inputs["ratings"])
+        ax.bar([r[0] for r in ratings], [r[1] for r in ratings], color="tab:purple")
+        ax.set_ylabel("frustration")
+    elif kind == "cohort_balloon":
+        c = interval_curves(load_balloon(inputs["balloon_all"]))
+        for key in ("hit_rate", "line_pos"):
+            mean, sem, _ = cohort_curve(c[key])
+            t = np.nanmean(c["interval_start_s"], axis=0)
+            ax.plot(t, mean, label=key)
+            ax.fill_between(t, mean - sem, mean + sem, alpha=0.25)
+        ax.set_xlabel("interval start (s)")
+        ax.legend()
+    ax.set_title(TITLES[kind])
+    fig.tight_layout()
+    fig.savefig(out_path)
+    plt.close(fig)
+    return out_path
+
+
+FIGURE_INPUTS = {
+    "accuracy": NBACK_TASKS,
+    "rt": NBACK_TASKS,
+    "balloon": ("balloon",),
+    "ratings": ("ratings",),
+}
+
+
+def plan_participant(participant_id, study_dir=STUDY_DIR, out_root=REPORT_DIR, ratings_dir=None):
+    # returns the participant's inputs plus the figure jobs whose cached copy is stale
+    out_dir = os.path.join(out_root, participant_id)
+    os.makedirs(out_dir, exist_ok=True)
+    inputs = session_inputs(participant_id, study_dir, ratings_dir)
+    cache_path = os.path.join(out_dir, "figure_hashes.json")
+    cache = {}
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            cache = json.load(f)
+    figures, jobs = {}, []
+    for kind, needs in FIGURE_INPUTS.items():
+        paths = [inputs[k] for k in needs if k in inputs]
+        if not paths:
+            continue
+        digest = file_hash(paths)
+        out_path = os.path.join(out_dir, f"{kind}.png")
+        figures[kind] = (digest, out_path)
+        if cache.get(kind) != digest or not os.path.exists(out_path):
+            jobs.append((kind, inputs, out_path))
+    return {"participant_id": participant_id, "out_dir": out_dir, "inputs": inputs,
+            "figures": figures, "cache_path": cache_path, "jobs": jobs}
+
+
+def write_report(plan, rendered):
+    # rendered: kind -> whether this run's render succeeded (kinds served from the cache are absent)
+    pid = plan["participant_id"]
+    summary = summarize(plan["inputs"])
+    with open(os.path.join(plan["out_dir"], "summary.json"), "w") as f:
+        json.dump({"participant_id": pid, "inputs": plan["inputs"], "summary": summary}, f, indent=1)
+    rows = []
+    for section, values in summary.items():
+        cells = "".join(f"<tr><td>{html.escape(str(k))}</td><td>{v:.3f}</td></tr>" if isinstance(v, float)
+                        else f"<tr><td>{html.escape(str(k))}</td><td>{html.escape(str(v))}</td></tr>"
+                        for k, v in values.items())
+        rows.append(f"<h2>{html.escape(section)}</h2><table>{cells}</table>")
+    imgs = "".join(f'<img src="{os.path.basename(path)}">' for kind, (_, path) in plan["figures"].items()
+                   if os.path.exists(path))
+    with open(os.path.join(plan["out_dir"], "report.html"), "w", encoding="utf-8") as f:
+        f.write(f"<html><head><meta charset='utf-8'><title>{html.escape(pid)}</title></head><body>"
+                f"<h1>Participant {html.escape(pid)}</h1>{imgs}{''.join(rows)}</body></html>")
+    # only figures that exist on disk are marked as cached
+    cache = {kind: digest for kind, (digest, path) in plan["figures"].items()
+             if os.path.exists(path) and (kind not in rendered or rendered[kind])}
+    with open(plan["cache_path"], "w") as f:
+        json.dump(cache, f, indent=1)
+    return summary
+
+
+def build_reports(participants, study_dir=STUDY_DIR, out_root=REPORT_DIR, workers=None, ratings_dir=None):
+    plans = [plan_participant(pid, study_dir, out_root, ratings_dir) for pid in participants]
+    jobs = [(plan["participant_id"], job) for plan in plans for job in plan["jobs"]]
+    rendered = {}
+    if jobs and not HAVE_MATPLOTLIB:
+        print("⚠️ matplotlib not installed, reports will have tables only")
+    elif jobs:
+        with ProcessPoolExecutor(workers) as pool:
+            futures = [(pid, job[0], pool.submit(render_figure, job)) for pid, job in jobs]
+            for pid, kind, fut in futures:
+                try:
+                    fut.result()
+                    rendered[(pid, kind)] = True
+                except Exception as e:
+                    rendered[(pid, kind)] = False
+                    print(f"❌ {pid} {kind} figure failed: {e}")
+    summaries = {}
+    for plan in plans:
+        pid = plan["participant_id"]
+        mine = {kind: ok for (p, kind), ok in rendered.items() if p == pid}
+        try:
+            summaries[pid] = write_report(plan, mine)
+        except Exception as e:
+            print(f"❌ {pid} report failed: {e}")
+    cached = sum(len(p["figures"]) for p in plans) - len(jobs)
+    print(f"📊 {len(summaries)} report(s) in {out_root}: {sum(rendered.values())} figure(s) rendered, "
+          f"{cached} reused from cache")
+    return summaries
+
+
+def all_participants(study_dir=STUDY_DIR):
+    found = set()
+    for task in (*NBACK_TASKS, "balloon"):
+        found.update(participant_of(p) for p in find_results(task, study_dir))
+    return sorted(found)
+
+
+def build_cohort(study_dir=STUDY_DIR, out_root=REPORT_DIR, workers=None, ratings_dir=None):
+    participants = all_participants(study_dir)
+    summaries = build_reports(participants, study_dir, out_root, workers, ratings_dir)
+    with open(os.path.join(out_root, "cohort_summary.csv"), "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["participant_id", "section", "metric", "value"])
+        for pid, summary in summaries.items():
+            for section, values in summary.items():
+                for metric, value in values.items():
+                    w.writerow([pid, section, metric, value])
+    balloon_paths = find_results("balloon", study_dir)
+    if HAVE_MATPLOTLIB and balloon_paths:
+        out_path = os.path.join(out_root, "cohort_balloon.png")
+        stamp = os.path.join(out_root, "cohort_balloon.hash")
+        digest = file_hash(balloon_paths)
+        old = open(stamp).read() if os.path.exists(stamp) else None
+        if old != digest or not os.path.exists(out_path):
+            render_figure(("cohort_balloon", {"balloon_all": balloon_paths}, out_path))
+            with open(stamp, "w") as f:
+                f.write(digest)
+    return summaries
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build per-participant (or cohort) session reports")
+    parser.add_argument("participants", nargs="*", help="participant IDs; omit with --cohort")
+    parser.add_argument("--cohort", action="store_true", help="every participant with results, plus cohort summary")
+    parser.add_argument("--study-dir", default=STUDY_DIR)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--ratings-dir", default=None, help="frustration ratings folder (default <study>/Frustration_Ratings)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    out_root = args.out or os.path.join(args.study_dir, "Reports")
+    os.makedirs(out_root, exist_ok=True)
+    if args.cohort:
+        build_cohort(args.study_dir, out_root, args.workers, args.ratings_dir)
+    elif args.participants:
+        build_reports(args.participants, args.study_dir, out_root, args.workers, args.ratings_dir)
+    else:
+        sys.exit("give participant IDs or --cohort")
@@ -0,0 +1,286 @@
+import os
+import csv
+import json
+import random
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+# Render-free balloon dynamics. red_balloon_shoot_game.py runs the same
+# BalloonField every frame, so difficulty can be calibrated offline against
+# synthetic shooters and a parameter grid here before anyone sits in the chair.
+GAME_DURATION = 297000
+STEP_DURATION = 11000
+PATTERN = [2, 4, 6, 8, 10, 12, 14, 12, 10, 8, 6, 4, 2]
+MIN_SPEED = 0.04
+MAX_SPEED = 0.20
+NONRED_INTERVAL = 600
+NONRED_BALLOONS_TOTAL = 1000
+LINE_MARGIN = 120
+LINE_STEP = 10
+RADIUS = 20
+RED = (255, 0, 0)
+COLORS = [(0, 255, 0), (0, 0, 255), (255, 255, 0)]
+
+DEFAULTS = {
+    "game_ms": GAME_DURATION, "step_ms": STEP_DURATION, "pattern": PATTERN,
+    "min_speed": MIN_SPEED, "max_speed": MAX_SPEED,
+    "nonred_ms": NONRED_INTERVAL, "nonred_total": NONRED_BALLOONS_TOTAL,
+    "game_w": 1000, "game_h": 800, "line_margin": LINE_MARGIN, "line_step": LINE_STEP,
+}
+
+
+class Balloon:
+    def __init__(self, x, y, color, speed, spawn_time):
+        self.x = x
+        self.y = y
+        self.radius = RADIUS
+        self.color = color
+        self.speed = speed
+        self.spawn_time = spawn_time
+        self.touched_line = False
+    def update(self, dt):
+        self.y += self.speed * dt
+    def is_clicked(self, pos):
+        dx = pos[0] - self.x
+        dy = pos[1] - self.y
+        return dx*dx + dy*dy <= self.radius*self.radius
+
+
+def red_schedule(game_ms, step_ms, pattern):
+    cycle_ms = len(pattern) * step_ms
+    times = []
+    cycles = (game_ms + cycle_ms - 1) // cycle_ms
+    for c in range(cycles):
+        base = c * cycle_ms
+        for i, count in enumerate(pattern):
+            phase_start = base + i * step_ms
+            if phase_start >= game_ms:
+                break
+            interval = step_ms / count
+            for j in range(count):
+                t = phase_start + j * interval
+                if t < game_ms:
+                    times.append(t)
+    times.sort()
+    return times
+
+
+def get_speed(elapsed, step_ms, phase_count, min_speed=MIN_SPEED, max_speed=MAX_SPEED):
+    cycle_pos = elapsed % (phase_count * step_ms)
+    phase_idx = min(int(cycle_pos // step_ms), phase_count - 1)
+    half = phase_count // 2
+    ratio = phase_idx/half if phase_idx <= half else (phase_count-1-phase_idx)/half
+    ratio = max(0.0, min(ratio, 1.0))
+    return min_speed + (max_speed - min_speed) * ratio
+
+
+class BalloonField:
+    # One game's worth of state: spawning, speed, hits and the line that red
+    # balloons drag down. `rng` is the module-level random in the game (seeded
+    # by the input tape, so the draw order here must not change) and a private
+    # Random in simulations. Simulations pass nonred=False: non-red balloons
+    # cannot be hit and never move the line, so skipping them changes nothing.
+    def __init__(self, params=None, offset_x=0, offset_y=0, now=0, rng=random, balloon_cls=Balloon, nonred=True):
+        p = dict(DEFAULTS, **(params or {}))
+        self.p = p
+        self.rng = rng
+        self.balloon_cls = balloon_cls
+        self.nonred = nonred
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.game_w = p["game_w"]
+        self.game_h = p["game_h"]
+        self.interval_count = p["game_ms"] // p["step_ms"]
+        self.interval_spawned = [0] * self.interval_count
+        self.interval_hits = [0] * self.interval_count
+        self.interval_reactions = [[] for _ in range(self.interval_count)]
+        self.interval_positions = [0] * self.interval_count
+        self.hit_events = []
+        self.balloons = []
+        self.red_active = 0
+        self.line_top = offset_y + p["line_margin"]
+        self.line_bottom = offset_y + self.game_h - p["line_margin"]
+        self.line_y = self.line_top
+        self.red_schedule = red_schedule(p["game_ms"], p["step_ms"], p["pattern"])
+        self.next_red_idx = 0
+        self.last_nonred = now
+        self.nonred_spawned = 0
+
+    def speed_at(self, elapsed):
+        p = self.p
+        return get_speed(elapsed, p["step_ms"], len(p["pattern"]), p["min_speed"], p["max_speed"])
+
+    def interval_at(self, elapsed):
+        return min(int(elapsed // self.p["step_ms"]), self.interval_count - 1)
+
+    def _spawn_x(self):
+        return self.rng.randint(self.offset_x + RADIUS, self.offset_x + self.game_w - RADIUS)
+
+    def spawn(self, elapsed, now, speed, idx):
+        # `now` is the clock the non-red cadence runs on (absolute ticks in the game)
+        new_reds = []
+        while self.next_red_idx < len(self.red_schedule) and elapsed >= self.red_schedule[self.next_red_idx]:
+            b = self.balloon_cls(self._spawn_x(), self.offset_y, RED, speed, elapsed)
+            self.balloons.append(b)
+            new_reds.append(b)
+            self.interval_spawned[idx] += 1
+            self.next_red_idx += 1
+        if self.nonred and now - self.last_nonred >= self.p["nonred_ms"] and self.nonred_spawned < self.p["nonred_total"]:
+            x = self._spawn_x()
+            self.balloons.append(self.balloon_cls(x, self.offset_y, self.rng.choice(COLORS), speed, elapsed))
+            self.nonred_spawned += 1
+            self.last_nonred = now
+        return new_reds
+
+    def shoot(self, pos, elapsed, idx):
+        # safe without a copy: the loop stops right after removing
+        for b in self.balloons:
+            if b.color == RED and b.is_clicked(pos):
+                reaction = elapsed - b.spawn_time
+                self.interval_reactions[idx].append(reaction)
+                self.interval_hits[idx] += 1
+                self.hit_events.append((elapsed, reaction))
+                self.line_y = max(self.line_top, self.line_y - self.p["line_step"])
+                self.balloons.remove(b)
+                return b
+        return None
+
+    def move(self, dt, speed, idx):
+        drag = 0
+        reds = 0
+        bottom = self.offset_y + self.game_h
+        # walk backwards so off-screen balloons can be deleted in place without copying the list
+        for i in range(len(self.balloons) - 1, -1, -1):
+            b = self.balloons[i]
+            b.speed = speed
+            b.update(dt)
+            if b.color == RED and b.y + b.radius >= self.line_y:
+                b.touched_line = True
+                drag = max(drag, b.speed)
+            if b.y > bottom + b.radius:
+                del self.balloons[i]
+            elif b.color == RED:
+                reds += 1
+        self.red_active = reds
+        if drag > 0:
+            self.line_y = min(self.line_bottom, self.line_y + drag * dt)
+        self.interval_positions[idx] = self.line_y
+
+    def line_pos_pixels(self):
+        return [pos - self.line_top for pos in self.interval_positions]
+
+
+class Shooter:
+    # Synthetic participant: notices each red balloon after a log-normal
+    # reaction time (unless it lapses), then clicks where the balloon is at
+    # that moment plus Gaussian aim error. Clicks are at least `refractory_ms`
+    # apart, like a real hand; a queued target that has left the field is a miss.
+    def __init__(self, rt_ms=550, rt_sd=0.25, aim_px=8.0, lapse=0.05, refractory_ms=250):
+        self.rt_ms = rt_ms
+        self.rt_sd = rt_sd
+        self.aim_px = aim_px
+        self.lapse = lapse
+        self.refractory_ms = refractory_ms
+
+
+SHOOTERS = {
+    "fast": Shooter(rt_ms=420, rt_sd=0.2, aim_px=6.0, lapse=0.02, refractory_ms=200),
+    "typical": Shooter(),
+    "slow": Shooter(rt_ms=750, rt_sd=0.3, aim_px=11.0, lapse=0.10, refractory_ms=350),
+}
+
+
+def simulate(params=None, shooter=None, seed=0, fps=60):
+    shooter = shooter or SHOOTERS["typical"]
+    rng = random.Random(seed)
+    field = BalloonField(params, rng=rng, nonred=False)
+    game_ms = field.p["game_ms"]
+    pending = []   # (time the click lands, balloon aimed at)
+    next_click = 0.0
+    frame = 0
+    elapsed = 0
+    while elapsed < game_ms:
+        frame += 1
+        t = round(frame * 1000 / fps)
+        dt = t - elapsed
+        elapsed = t
+        if elapsed >= game_ms:
+            break
+        speed = field.speed_at(elapsed)
+        idx = field.interval_at(elapsed)
+        for b in field.spawn(elapsed, elapsed, speed, idx):
+            if rng.random() >= shooter.lapse:
+                lands = max(elapsed + shooter.rt_ms * rng.lognormvariate(0, shooter.rt_sd), next_click)
+                pending.append((lands, b))
+                next_click = lands + shooter.refractory_ms
+        while pending and pending[0][0] <= elapsed:
+            _, b = pending.pop(0)
+            if b in field.balloons:
+                field.shoot((b.x + rng.gauss(0, shooter.aim_px), b.y + rng.gauss(0, shooter.aim_px)), elapsed, idx)
+        field.move(dt, speed, idx)
+    hit_rate = [h / s if s else 0.0 for h, s in zip(field.interval_hits, field.interval_spawned)]
+    return {"hit_rate": hit_rate, "line_pos_pixels": field.line_pos_pixels(),
+            "hits": sum(field.interval_hits), "spawned": sum(field.interval_spawned)}
+
+
+def _run_config(job):
+    config_id, params, shooter_name, seeds = job
+    runs = [simulate(params, SHOOTERS[shooter_name], seed) for seed in seeds]
+    n = len(runs)
+    curves = {key: [sum(r[key][i] for r in runs) / n for i in range(len(runs[0][key]))]
+              for key in ("hit_rate", "line_pos_pixels")}
+    overall = sum(r["hits"] for r in runs) / max(sum(r["spawned"] for r in runs), 1)
+    return config_id, params, shooter_name, overall, curves
+
+
+def expand_grid(grid):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def sweep(grid, shooters, seeds=10, out_dir="balloon_sweep", workers=None):
+    configs = expand_grid(grid)
+    jobs = [(i, params, name, list(range(seeds))) for i, params in enumerate(configs) for name in shooters]
+    os.makedirs(out_dir, exist_ok=True)
+    summary_path = os.path.join(out_dir, "sweep_summary.csv")
+    curves_path = os.path.join(out_dir, "sweep_curves.csv")
+    with ProcessPoolExecutor(workers) as pool, open(summary_path, "w", newline="") as fs, \
+            open(curves_path, "w", newline="") as fc:
+        ws, wc = csv.writer(fs), csv.writer(fc)
+        ws.writerow(["config_id", "shooter", "params", "hit_rate", "mean_line_pos_pixels", "final_line_pos_pixels"])
+        wc.writerow(["config_id", "shooter", "interval", "hit_rate", "line_pos_pixels"])
+        for config_id, params, name, overall, curves in pool.map(_run_config, jobs, chunksize=4):
+            line = curves["line_pos_pixels"]
+            ws.writerow([config_id, name, json.dumps(params), round(overall, 4),
+                         round(sum(line) / len(line), 2), round(line[-1], 2)])
+            for i, (rate, pos) in enumerate(zip(curves["hit_rate"], line)):
+                wc.writerow([config_id, name, i, round(rate, 4), round(pos, 2)])
+    print(f"✅ {len(jobs)} configuration/shooter pairs x {seeds} seeds -> {summary_path}, {curves_path}")
+    return summary_path, curves_path
+
+
+def parse_grid(items):
+    # "max_speed=0.16,0.2,0.24"; pattern takes "/"-separated lists, e.g. "pattern=2/4/6/4/2"
+    grid = {}
+    for item in items:
+        key, values = item.split("=", 1)
+        if key not in DEFAULTS:
+            raise SystemExit(f"unknown parameter '{key}' (choose from {', '.join(sorted(DEFAULTS))})")
+        if key == "pattern":
+            grid[key] = [[int(n) for n in v.split("/")] for v in values.split(",")]
+        else:
+            cast = type(DEFAULTS[key])
+            grid[key] = [cast(v) for v in values.split(",")]
+    return grid
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sweep balloon difficulty parameters against synthetic shooters")
+    parser.add_argument("--grid", action="append", default=[], help="param=v1,v2,... (repeatable)")
+    parser.add_argument("--shooter", action="append", choices=sorted(SHOOTERS), help="default: all profiles")
+    parser.add_argument("--seeds", type=int, default=10)
+    parser.add_argument("--out", default="balloon_sweep")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    sweep(parse_grid(args.grid), args.shooter or sorted(SHOOTERS), args.seeds, args.out, args.workers)
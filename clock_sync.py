@@ -0,0 +1,218 @@
+import os
+import sys
+import json
+import time
+import struct
+import socket
+import argparse
+import threading
+
+# One session timebase plus an NTP-style mapping to the fNIRS recorder's clock.
+# The session runner fixes the session zero on time.perf_counter() (QPC on
+# Windows, CLOCK_MONOTONIC on Linux: system-wide and sub-microsecond, unlike
+# time.monotonic()/time.time() on Windows before 3.13, which tick at ~15.6 ms)
+# and exports it, so session_time() means the same thing in the runner and in
+# each task. Unix times are derived from the session zero's wall stamp. When MVO_RECORDER_CLOCK=host:port
+# names a clock endpoint on the recording machine (see `serve` below), a
+# background thread sends bursts of UDP probes, keeps the lowest-delay probe of
+# each burst, and fits recorder = a + b * local time. The samples and fits are
+# rewritten to <pid>_clock_sync.json after every burst; samples already in the
+# file (a session resumed after a crash) are kept and fitted along with them.
+RECORDER = os.environ.get("MVO_RECORDER_CLOCK")
+SESSION_ZERO = float(os.environ.get("MVO_SESSION_ZERO", time.perf_counter()))
+SESSION_ZERO_UNIX = float(os.environ.get("MVO_SESSION_ZERO_UNIX", time.time()))
+DEFAULT_PORT = 8766
+SYNC_EVERY_S = 10.0
+PROBES_PER_BURST = 8
+PROBE_TIMEOUT_S = 0.2
+REQUEST = struct.Struct("!Id")     # seq, t1 (client send)
+REPLY = struct.Struct("!Iddd")     # seq, t1, t2 (server receive), t3 (server send)
+
+
+def session_time():
+    return time.perf_counter() - SESSION_ZERO
+
+
+def start_session(zero=None, zero_unix=None):
+    # called once by the runner (with the saved zero when resuming); tasks inherit it through the environment
+    global SESSION_ZERO, SESSION_ZERO_UNIX
+    if zero is None:
+        zero, zero_unix = time.perf_counter(), time.time()
+    SESSION_ZERO, SESSION_ZERO_UNIX = zero, zero_unix
+    os.environ["MVO_SESSION_ZERO"] = repr(SESSION_ZERO)
+    os.environ["MVO_SESSION_ZERO_UNIX"] = repr(SESSION_ZERO_UNIX)
+    return SESSION_ZERO, SESSION_ZERO_UNIX
+
+
+def fit_line(xs, ys):
+    # least squares y = a + b*x, centred on the first x to keep precision on unix times
+    n = len(xs)
+    if n == 0:
+        return None
+    x0 = xs[0]
+    if n == 1:
+        return {"a": ys[0] - x0, "b": 1.0, "x0": 0.0, "drift_ppm": 0.0, "rms_us": 0.0, "n": 1}
+    mx = sum(x - x0 for x in xs) / n
+    my = sum(ys) / n
+    var = sum((x - x0 - mx) ** 2 for x in xs)
+    b = sum((x - x0 - mx) * (y - my) for x, y in zip(xs, ys)) / var if var else 1.0
+    a = my - b * mx
+    rms = (sum((a + b * (x - x0) - y) ** 2 for x, y in zip(xs, ys)) / n) ** 0.5
+    return {"a": a, "b": b, "x0": x0, "drift_ppm": (b - 1.0) * 1e6, "rms_us": rms * 1e6, "n": n}
+
+
+def to_recorder(fit, t):
+    return fit["a"] + fit["b"] * (t - fit["x0"])
+
+
+def from_recorder(fit, r):
+    return (r - fit["a"]) / fit["b"] + fit["x0"]
+
+
+class ClockSync:
+    def __init__(self, recorder, out_path, every_s=SYNC_EVERY_S, probes=PROBES_PER_BURST, merge=True):
+        host, _, port = recorder.rpartition(":")
+        self.addr = (host or "127.0.0.1", int(port or DEFAULT_PORT))
+        self.out_path = out_path
+        self.every_s = every_s
+        self.probes = probes
+        self.runs = 1
+        self.samples = self._earlier_samples() if merge else []   # [session_s, unix, recorder_time, round_trip_s]
+        self.seq = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.settimeout(PROBE_TIMEOUT_S)
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _earlier_samples(self):
+        if not os.path.exists(self.out_path):
+            return []
+        try:
+            with open(self.out_path) as f:
+                doc = json.load(f)
+        except ValueError:
+            return []
+        self.runs += doc.get("runs", 1)
+        # a resume that kept the session zero needs no shift; after a reboot the
+        # earlier session times are carried over on the wall clock
+        shift = doc.get("session_zero_unix", SESSION_ZERO_UNIX) - SESSION_ZERO_UNIX
+        return [[s[0] + shift, s[1], s[2], s[3]] for s in doc.get("samples", [])]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def probe(self):
+        self.seq += 1
+        t1 = time.perf_counter()
+        self.sock.sendto(REQUEST.pack(self.seq, t1), self.addr)
+        while True:
+            try:
+                data, _ = self.sock.recvfrom(64)
+            except socket.timeout:
+                return None
+            t4 = time.perf_counter()
+            seq, echo, t2, t3 = REPLY.unpack(data)
+            if seq == self.seq and echo == t1:   # ignore late replies to earlier probes
+                break
+        # the recorder's clock at the local midpoint of the exchange; its error is at most delay / 2
+        delay = (t4 - t1) - (t3 - t2)
+        mid = (t1 + t4) / 2
+        recorder_at_mid = mid + ((t2 - t1) + (t3 - t4)) / 2
+        return [mid - SESSION_ZERO, SESSION_ZERO_UNIX + (mid - SESSION_ZERO), recorder_at_mid, delay]
+
+    def burst(self):
+        got = [p for p in (self.probe() for _ in range(self.probes)) if p]
+        if not got:
+            return None
+        best = min(got, key=lambda p: p[3])
+        self.samples.append(best)
+        self.write()
+        return best
+
+    def _loop(self):
+        while True:
+            try:
+                self.burst()
+            except OSError as e:
+                print(f"⚠️ Clock sync probe failed: {e}")
+            if self._stop.wait(self.every_s):
+                return
+
+    def fits(self):
+        return {"session": fit_line([s[0] for s in self.samples], [s[2] for s in self.samples]),
+                "unix": fit_line([s[1] for s in self.samples], [s[2] for s in self.samples])}
+
+    def write(self):
+        fits = self.fits()
+        delays = sorted(s[3] for s in self.samples)
+        doc = {"recorder": f"{self.addr[0]}:{self.addr[1]}", "session_zero_unix": SESSION_ZERO_UNIX, "runs": self.runs,
+               "fit_session": fits["session"], "fit_unix": fits["unix"],
+               "median_round_trip_us": delays[len(delays) // 2] * 1e6 if delays else None,
+               "columns": ["session_s", "unix", "recorder", "round_trip_s"], "samples": self.samples}
+        tmp = self.out_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(doc, f, indent=1)
+        os.replace(tmp, self.out_path)
+
+    def stop(self):
+        self._stop.set()
+        self.thread.join()
+        self.burst()   # one last point so the fit spans the whole session
+        self.sock.close()
+        fit = self.fits()["session"]
+        if fit:
+            print(f"🕒 Clock sync: {fit['n']} points, drift {fit['drift_ppm']:.2f} ppm, "
+                  f"residual {fit['rms_us']:.0f} µs -> {self.out_path}")
+
+
+def start(participant_id, folder):
+    if not RECORDER:
+        return None
+    return ClockSync(RECORDER, os.path.join(folder, f"{participant_id}_clock_sync.json")).start()
+
+
+def load_mapping(path, kind="unix"):
+    with open(path) as f:
+        return json.load(f)[f"fit_{kind}"]
+
+
+def serve(host, port, offset_s=0.0, drift_ppm=0.0):
+    # stand-in for the agent on the recording machine; --offset/--drift-ppm fake a skewed device clock
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((host, port))
+    # the recorder's wall clock, which is what device exports timestamp with
+    base, base_unix = time.perf_counter(), time.time()
+    clock = lambda: base_unix + offset_s + (time.perf_counter() - base) * (1 + drift_ppm * 1e-6)
+    print(f"🕒 Recorder clock listening on udp://{host}:{port} (offset {offset_s} s, drift {drift_ppm} ppm)")
+    while True:
+        data, addr = sock.recvfrom(64)
+        t2 = clock()
+        if len(data) != REQUEST.size:
+            continue
+        seq, t1 = REQUEST.unpack(data)
+        sock.sendto(REPLY.pack(seq, t1, t2, clock()), addr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recorder clock endpoint / clock sync check")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("serve", help="run a recorder clock endpoint")
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=DEFAULT_PORT)
+    p.add_argument("--offset", type=float, default=0.0)
+    p.add_argument("--drift-ppm", type=float, default=0.0)
+    p = sub.add_parser("check", help="sync against an endpoint for a while and print the fit")
+    p.add_argument("recorder", help="host:port")
+    p.add_argument("--seconds", type=float, default=30.0)
+    p.add_argument("--every", type=float, default=1.0)
+    p.add_argument("--out", default="clock_sync_check.json")
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        serve(args.host, args.port, args.offset, args.drift_ppm)
+    else:
+        sync = ClockSync(args.recorder, args.out, every_s=args.every, merge=False).start()
+        time.sleep(args.seconds)
+        sync.stop()
+        if not sync.samples:
+            sys.exit("❌ no replies from the recorder clock")
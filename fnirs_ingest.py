@@ -0,0 +1,231 @@
+import os
+import io
+import re
+import csv
+import glob
+import mmap
+import argparse
+from datetime import datetime, timezone
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import session_timeline
+import session_manifest
+import clock_sync
+
+# Column layout of each device's CSV export. The time column must be wall
+# clock seconds (unix); columns are matched by regex against the header so
+# any number of channels is picked up. Adjust if a firmware update renames them.
+DEVICE_PROFILES = {
+    "mendi": {"time": r"^(unix_)?time(stamp)?(_s)?$", "hbo": r"hbo", "hbr": r"hbr"},
+    "octamon": {"time": r"^(unix_)?time(stamp)?(_s)?$", "hbo": r"o2hb|hbo", "hbr": r"hhb|hbr"},
+}
+CHUNK_BYTES = 8 * 1024 * 1024
+CHUNK_SAMPLES = 100000
+BASELINE_S = 10.0   # last part of the fixation preceding each block (or before a fixation's onset)
+EPOCH_PHASES = ("fixation", "countdown", "task", "rating")
+
+
+def _match_columns(header, profile):
+    cols = [h.strip().lower() for h in header]
+    pick = lambda pat: [i for i, c in enumerate(cols) if re.search(pat, c)]
+    time_idx = pick(profile["time"])
+    if not time_idx:
+        raise ValueError(f"no time column in header {header}")
+    return time_idx[0], pick(profile["hbo"]), pick(profile["hbr"])
+
+
+def iter_csv_chunks(path, device):
+    # Memory-maps the export and parses it a few MB at a time, cut on line
+    # boundaries, so arbitrarily long recordings never sit in memory whole.
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        header_end = mm.find(b"\n") + 1
+        header = next(csv.reader([mm[:header_end].decode("utf-8-sig")]))
+        t_col, hbo_cols, hbr_cols = _match_columns(header, DEVICE_PROFILES[device])
+        usecols = [t_col] + hbo_cols + hbr_cols
+        pos = header_end
+        while pos < len(mm):
+            end = mm.find(b"\n", min(pos + CHUNK_BYTES, len(mm) - 1))
+            end = len(mm) if end < 0 else end + 1
+            block = np.loadtxt(io.BytesIO(mm[pos:end]), delimiter=",", usecols=usecols, ndmin=2)
+            pos = end
+            if block.size:
+                n_hbo = len(hbo_cols)
+                yield block[:, 0], block[:, 1:1 + n_hbo], block[:, 1 + n_hbo:]
+
+
+def iter_snirf_chunks(path):
+    import h5py
+    with h5py.File(path, "r") as f:
+        nirs = f["nirs"]
+        tags = nirs["metaDataTags"]
+        read = lambda k: tags[k][()].decode() if isinstance(tags[k][()], bytes) else str(tags[k][()])
+        stamp = f"{read('MeasurementDate')}T{read('MeasurementTime')}"
+        start = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        t0 = start.timestamp()
+        data = nirs["data1"]
+        labels = []
+        i = 1
+        while f"measurementList{i}" in data:
+            ml = data[f"measurementList{i}"]
+            label = ml["dataTypeLabel"][()] if "dataTypeLabel" in ml else b""
+            labels.append(label.decode() if isinstance(label, bytes) else str(label))
+            i += 1
+        hbo_cols = [j for j, l in enumerate(labels) if l.lower() == "hbo"]
+        hbr_cols = [j for j, l in enumerate(labels) if l.lower() == "hbr"]
+        time = data["time"]
+        series = data["dataTimeSeries"]
+        # h5py reads only the requested slice, so chunking keeps memory flat
+        for a in range(0, series.shape[0], CHUNK_SAMPLES):
+            b = min(a + CHUNK_SAMPLES, series.shape[0])
+            chunk = series[a:b]
+            yield t0 + time[a:b], chunk[:, hbo_cols], chunk[:, hbr_cols]
+
+
+def iter_chunks(path, device):
+    if path.lower().endswith((".snirf", ".h5", ".hdf5")):
+        return iter_snirf_chunks(path)
+    return iter_csv_chunks(path, device)
+
+
+def task_onsets(manifest_path):
+    # (task, unix time of the first trial) per task run; older manifests fall back to the trial log
+    onsets = []
+    for entry in session_manifest.read_manifest(manifest_path):
+        onset = entry.get("first_onset_unix")
+        trials = entry.get("trials")
+        if onset is None and trials and os.path.exists(trials):
+            with open(trials, newline="") as f:
+                first = next(csv.DictReader(f), None)
+            if first and first.get("onset_unix"):
+                onset = float(first["onset_unix"])
+        if onset is not None:
+            onsets.append((entry["task"], onset))
+    return onsets
+
+
+def epoch_windows(timeline, baseline_s=BASELINE_S, onsets=()):
+    # (phase, task, start, end, baseline_start, baseline_end) for every block.
+    # A block's baseline is the tail of the most recent fixation before it; a
+    # fixation's own baseline is the baseline_s before its onset. The task
+    # block spans the whole subprocess (startup, display, calibration), so its
+    # epoch starts at the task's first trial when the manifest has one.
+    windows = []
+    last_fix = None
+    for row in timeline:
+        phase, start, end = row["phase"], row["start_unix"], row["end_unix"]
+        if phase == "task":
+            start = next((o for t, o in onsets if t == row["task"] and start <= o < end), start)
+        if phase == "fixation":
+            b_start, b_end = start - baseline_s, start
+        elif last_fix is not None:
+            b_end = min(last_fix["end_unix"], start)
+            b_start = max(last_fix["start_unix"], b_end - baseline_s)
+        else:
+            b_start = b_end = np.nan
+        if phase == "fixation":
+            last_fix = row
+        if phase in EPOCH_PHASES:
+            windows.append((phase, row["task"], start, end, b_start, b_end))
+    return windows
+
+
+def block_averages(path, device, timeline, clock_offset_s=0.0, baseline_s=BASELINE_S, sync_fit=None, onsets=()):
+    windows = epoch_windows(timeline, baseline_s, onsets)
+    n = len(windows)
+    starts = np.array([w[2] for w in windows])
+    ends = np.array([w[3] for w in windows])
+    b_starts = np.array([w[4] for w in windows])
+    b_ends = np.array([w[5] for w in windows])
+    sums = counts = b_sums = b_counts = None
+    for t, hbo, hbr in iter_chunks(path, device):
+        if sync_fit:
+            # recorder clock -> stimulus PC clock via the mapping fitted during the session
+            t = clock_sync.from_recorder(sync_fit, t)
+        t = t + clock_offset_s
+        x = np.hstack([hbo, hbr])
+        if sums is None:
+            width = x.shape[1]
+            sums, b_sums = np.zeros((n, width)), np.zeros((n, width))
+            counts, b_counts = np.zeros(n), np.zeros(n)
+            n_hbo = hbo.shape[1]
+        # prefix sums turn every window's partial sum into two lookups
+        csum = np.vstack([np.zeros((1, x.shape[1])), np.cumsum(x, axis=0)])
+        for lo_t, hi_t, acc, cnt in ((starts, ends, sums, counts), (b_starts, b_ends, b_sums, b_counts)):
+            valid = ~np.isnan(lo_t)
+            lo = np.searchsorted(t, lo_t[valid], side="left")
+            hi = np.searchsorted(t, hi_t[valid], side="left")
+            acc[valid] += csum[hi] - csum[lo]
+            cnt[valid] += hi - lo
+    if sums is None:
+        return []
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = sums / counts[:, None]
+        base = b_sums / b_counts[:, None]
+    corrected = mean - base
+    rows = []
+    for i, (phase, task, start, end, _, _) in enumerate(windows):
+        rows.append({
+            "phase": phase, "task": task, "start_unix": start, "duration_s": end - start,
+            "samples": int(counts[i]), "baseline_samples": int(b_counts[i]),
+            "hbo": corrected[i, :n_hbo], "hbr": corrected[i, n_hbo:],
+        })
+    return rows
+
+
+def process_participant(job):
+    participant_id, device, recording, timeline_path, clock_offset_s, sync_path = job
+    sync_fit = clock_sync.load_mapping(sync_path) if sync_path else None
+    manifest = os.path.join(os.path.dirname(timeline_path), f"{participant_id}_manifest.jsonl")
+    rows = block_averages(recording, device, session_timeline.load_timeline(timeline_path), clock_offset_s,
+                          sync_fit=sync_fit, onsets=task_onsets(manifest))
+    out = []
+    for r in rows:
+        for ch, (hbo, hbr) in enumerate(zip(r["hbo"], r["hbr"])):
+            out.append([participant_id, device, r["phase"], r["task"], f"{r['start_unix']:.3f}",
+                        round(r["duration_s"], 3), ch + 1, r["samples"], r["baseline_samples"],
+                        round(float(hbo), 6), round(float(hbr), 6)])
+    return participant_id, out
+
+
+def find_jobs(recordings_dir, device, timeline_dir=session_timeline.TIMELINE_DIR, clock_offset_s=0.0):
+    # recordings are expected to be named <participant_id>_<anything>.<csv|snirf>
+    jobs = []
+    for tl in sorted(glob.glob(os.path.join(timeline_dir, "*_session_timeline.csv"))):
+        pid = os.path.basename(tl)[:-len("_session_timeline.csv")]
+        sync_path = os.path.join(timeline_dir, f"{pid}_clock_sync.json")
+        sync_path = sync_path if os.path.exists(sync_path) else None
+        for ext in ("csv", "snirf", "h5", "hdf5"):
+            found = sorted(glob.glob(os.path.join(recordings_dir, f"{glob.escape(pid)}_*.{ext}")))
+            if found:
+                jobs.append((pid, device, found[0], tl, clock_offset_s, sync_path))
+                break
+    return jobs
+
+
+def run_batch(jobs, out_path, workers=None):
+    with ProcessPoolExecutor(workers) as pool, open(out_path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["participant_id", "device", "phase", "task", "start_unix", "duration_s", "channel",
+                    "samples", "baseline_samples", "hbo_baseline_corrected", "hbr_baseline_corrected"])
+        for pid, rows in pool.map(process_participant, jobs):
+            w.writerows(rows)
+            print(f"🧠 {pid}: {len(rows)} block/channel averages")
+    print(f"✅ fNIRS block averages saved to: {out_path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Block-average fNIRS exports against session timelines")
+    parser.add_argument("device", choices=sorted(DEVICE_PROFILES))
+    parser.add_argument("recordings_dir")
+    parser.add_argument("--timelines", default=session_timeline.TIMELINE_DIR)
+    parser.add_argument("--out", default=None)
+    parser.add_argument("--clock-offset", type=float, default=0.0,
+                        help="seconds to add to device timestamps to reach stimulus PC time "
+                             "(after the <pid>_clock_sync.json mapping, when the session recorded one)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    jobs = find_jobs(args.recordings_dir, args.device, args.timelines, args.clock_offset)
+    out = args.out or os.path.join(args.recordings_dir, f"{args.device}_block_averages.csv")
+    run_batch(jobs, out, args.workers)
@@ -0,0 +1,117 @@
+import os
+import time
+import pygame
+
+# Set MVO_VSYNC=1 (the session runner passes it on to every task) to lock
+# presentation to the display refresh and count stimulus durations in frames.
+VSYNC_MODE = os.environ.get("MVO_VSYNC", "0") == "1"
+# MVO_LOGICAL_RES=1920x1080 lays every screen out on a fixed logical canvas
+# that SDL scales to the monitor in one GPU step, so per-frame pixel work and
+# font sizes (in logical pixels) are the same on every lab machine.
+def _parse_res(name):
+    # "WxH"; anything else falls back to the native resolution instead of stopping the task
+    value = os.environ.get(name, "").strip()
+    if not value:
+        return "", None
+    try:
+        w, h = (int(n) for n in value.lower().split("x"))
+        if w <= 0 or h <= 0:
+            raise ValueError
+    except ValueError:
+        print(f"⚠️ {name}={value!r} is not WIDTHxHEIGHT, using the native resolution")
+        return "", None
+    return value, (w, h)
+
+
+LOGICAL_RES, LOGICAL_SIZE = _parse_res("MVO_LOGICAL_RES")
+# replay.py sets the display size a recording was made at (MVO_DISPLAY_SIZE=WxH)
+# so layouts and the recorded absolute mouse positions line up again
+DISPLAY_RES, DISPLAY_SIZE = _parse_res("MVO_DISPLAY_SIZE")
+CALIBRATION_FRAMES = 90
+# a calibrated period outside this range means the flip isn't blocking on the refresh
+MIN_PERIOD_MS, MAX_PERIOD_MS = 4.0, 50.0
+
+
+def disable_vsync(reason):
+    # timed presentation (FPS-capped ticks, durations in ms) whenever vsync isn't really in effect
+    global VSYNC_MODE
+    if VSYNC_MODE:
+        print(f"⚠️ {reason}, using timed presentation instead of vsync")
+    VSYNC_MODE = False
+
+
+def open_display(caption):
+    info = pygame.display.Info()
+    size = LOGICAL_SIZE or DISPLAY_SIZE or (info.current_w, info.current_h)
+    screen = None
+    if VSYNC_MODE or LOGICAL_SIZE:
+        # SDL only honours vsync on a renderer-backed window, hence SCALED;
+        # the same renderer stretches a logical canvas to the physical display
+        try:
+            screen = pygame.display.set_mode(size, pygame.FULLSCREEN | pygame.SCALED, vsync=int(VSYNC_MODE))
+        except pygame.error as e:
+            print(f"⚠️ scaled/vsync display not available ({e}), falling back to the native display")
+            # a replay keeps the mode the recording was made in
+            if not os.environ.get("MVO_REPLAY"):
+                disable_vsync("vsync display not available")
+    if screen is None and DISPLAY_SIZE:
+        screen = pygame.display.set_mode(DISPLAY_SIZE)
+    if screen is None:
+        screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
+    pygame.display.set_caption(caption)
+    return screen
+
+
+def refresh_plausible(period_ms):
+    # run on the (taped) calibration result, so replays make the same decision
+    if MIN_PERIOD_MS <= period_ms <= MAX_PERIOD_MS:
+        return True
+    disable_vsync(f"calibrated refresh period {period_ms:.2f} ms is implausible")
+    return False
+
+
+def stimulus_alpha(phase, display, fade):
+    # phase, display and fade share one unit: ms in timed mode, frames in vsync mode.
+    # The fade starts below full alpha, so the stimulus is at 255 for exactly `display`.
+    if phase < display:
+        return 255
+    if phase < display + fade:
+        return max(0, 255 - int(255 * (phase - display + 1) / fade))
+    return 0
+
+
+class FrameClock:
+    def __init__(self, fps, display):
+        self.fps = fps
+        self.display = display
+        self.clock = pygame.time.Clock()
+        self.period_ms = 1000.0 / fps
+        self.last_flip = None
+
+    def flip(self):
+        self.display.present()
+        # with vsync the flip blocks until the buffer swap, so its return is the onset
+        self.last_flip = time.perf_counter()
+        return self.last_flip
+
+    def tick(self):
+        if VSYNC_MODE:
+            # the blocking flip already paces the loop
+            return self.clock.tick()
+        return self.clock.tick(self.fps)
+
+    def calibrate(self, color, frames=CALIBRATION_FRAMES):
+        stamps = []
+        for _ in range(frames):
+            pygame.event.pump()
+            self.display.clear(color)
+            stamps.append(self.flip())
+        intervals = sorted((b - a) * 1000.0 for a, b in zip(stamps, stamps[1:]))
+        if intervals:
+            # median is robust to the odd dropped or doubled frame
+            self.period_ms = intervals[len(intervals) // 2]
+        print(f"🖥️ Estimated refresh period: {self.period_ms:.3f} ms ({1000.0 / self.period_ms:.2f} Hz)")
+        return self.period_ms
+
+    def frames(self, ms):
+        return max(1, int(round(ms / self.period_ms)))
@@ -0,0 +1,99 @@
+import os
+import gc
+import sys
+import tempfile
+import runpy
+import tracemalloc
+from contextlib import contextmanager
+from multiprocessing import Pool
+
+# MVO_MANAGED_GC=1 keeps the cyclic collector out of timed blocks: everything
+# built during setup is frozen into the permanent generation, automatic
+# collection is off while frames are being timed, and the session runner
+# collects explicitly on fixation and rating screens where a pause is harmless.
+MANAGED_GC = os.environ.get("MVO_MANAGED_GC", "0") == "1"
+MAX_BYTES_PER_FRAME = 64
+
+
+def after_setup():
+    if MANAGED_GC:
+        gc.collect()
+        gc.freeze()
+
+
+@contextmanager
+def timed_block():
+    was_enabled = gc.isenabled()
+    if MANAGED_GC:
+        gc.disable()
+    try:
+        yield
+    finally:
+        if MANAGED_GC and was_enabled:
+            gc.enable()
+
+
+def collect():
+    if MANAGED_GC:
+        gc.collect()
+
+
+class FrameAllocationProbe:
+    # Samples traced heap size every `every` frames (frames are counted on each
+    # frame-delta read from the input tape) and fits the steady-state growth.
+    # Sampling sparsely keeps the probe's own list out of the measurement.
+    def __init__(self, warmup_frames=300, every=100):
+        self.warmup_frames = warmup_frames
+        self.every = every
+        self.frames = 0
+        self.sizes = []
+
+    def __call__(self):
+        self.frames += 1
+        if self.frames > self.warmup_frames and self.frames % self.every == 0:
+            self.sizes.append(tracemalloc.get_traced_memory()[0])
+
+    def bytes_per_frame(self):
+        # None when there are too few steady-state samples to fit a slope
+        n = len(self.sizes)
+        if n < 2:
+            return None
+        mean_x = (n - 1) / 2
+        mean_y = sum(self.sizes) / n
+        cov = sum((i - mean_x) * (y - mean_y) for i, y in enumerate(self.sizes))
+        var = sum((i - mean_x) ** 2 for i in range(n))
+        return cov / var / self.every
+
+
+def check_recording(recording, limit=MAX_BYTES_PER_FRAME):
+    # Replays a recorded task headless and fails if the frame loop keeps growing
+    # the heap; run it against a fresh recording after touching run_game/Game.run.
+    import replay
+    with tempfile.TemporaryDirectory() as out:
+        script = replay.prepare(recording, out)
+        import input_tape
+        probe = FrameAllocationProbe()
+        input_tape.FRAME_HOOKS.append(probe)
+        tracemalloc.start()
+        try:
+            runpy.run_path(script, run_name="__main__")
+        finally:
+            tracemalloc.stop()
+    growth = probe.bytes_per_frame()
+    if growth is None:
+        print(f"❌ {os.path.basename(recording)}: only {len(probe.sizes)} steady-state sample(s) in "
+              f"{probe.frames} frames; the recording is too short to measure")
+        return False
+    ok = growth <= limit
+    print(f"{'✅' if ok else '❌'} {os.path.basename(recording)}: {growth:.1f} bytes/frame "
+          f"over {probe.frames - probe.warmup_frames} steady-state frames (limit {limit})")
+    return ok
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python gc_control.py <task>_inputs.jsonl [...]")
+    # one process per recording, since task modules and their helpers read settings at import
+    with Pool(maxtasksperchild=1) as pool:
+        results = pool.map(check_recording, sys.argv[1:])
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,135 @@
+import os
+import sys
+import json
+import random
+import pygame
+import frame_timing
+
+# Every nondeterministic value a task consumes (clock reads, polled input,
+# frame deltas, flip timestamps) goes through a tape. Live runs record it to
+# a JSON-lines file next to the results; replay.py sets MVO_REPLAY to play a
+# recording back through the same task code on a virtual clock.
+REPLAY_PATH = os.environ.get("MVO_REPLAY")
+REPLAY_RENDER = os.environ.get("MVO_REPLAY_RENDER", "0") == "1"
+RECORDED_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN, pygame.MOUSEMOTION)
+EVENT_FIELDS = ("key", "unicode", "button", "pos", "rel")
+# called once per frame (on every frame-delta sample); used by gc_control's allocation probe
+FRAME_HOOKS = []
+
+
+def encode_event(e):
+    rec = {"type": e.type}
+    for name in EVENT_FIELDS:
+        if hasattr(e, name):
+            val = getattr(e, name)
+            rec[name] = list(val) if isinstance(val, tuple) else val
+    return rec
+
+
+def decode_event(rec):
+    attrs = {k: tuple(v) if isinstance(v, list) else v for k, v in rec.items() if k != "type"}
+    return pygame.event.Event(rec["type"], attrs)
+
+
+class LiveInput:
+    replaying = False
+    rendering = True
+
+    def __init__(self, path, task, display_size):
+        self.path = path
+        env_seed = os.environ.get("MVO_SEED")
+        self.seed = int(env_seed) if env_seed else random.SystemRandom().randrange(2 ** 32)
+        random.seed(self.seed)
+        self.f = open(path, "w")
+        header = {"task": task, "argv": sys.argv[1:], "seed": self.seed,
+                  "vsync": frame_timing.VSYNC_MODE, "logical_res": frame_timing.LOGICAL_RES,
+                  "display_size": list(display_size), "session_clock": True,
+                  "sequences": os.environ.get("MVO_SEQUENCES", "")}
+        self.f.write(json.dumps(header) + "\n")
+
+    def _log(self, kind, value):
+        self.f.write(json.dumps([kind, value], separators=(",", ":")) + "\n")
+
+    def sample(self, kind, fn):
+        value = fn()
+        self._log(kind, value)
+        if kind == "d":
+            for hook in FRAME_HOOKS:
+                hook()
+        return value
+
+    def ticks(self):
+        return self.sample("t", pygame.time.get_ticks)
+
+    def mouse_pos(self, read=pygame.mouse.get_pos):
+        return self.sample("m", read)
+
+    def flip(self, present):
+        return self.sample("f", present)
+
+    def events(self):
+        polled = [e for e in pygame.event.get() if e.type in RECORDED_EVENTS]
+        self._log("e", [encode_event(e) for e in polled])
+        return polled
+
+    def close(self):
+        self.f.close()
+        print(f"🎞️ Input recording saved to: {self.path}")
+
+
+class ReplayInput:
+    replaying = True
+
+    def __init__(self, path):
+        self.f = open(path)
+        header = json.loads(self.f.readline())
+        self.task = header["task"]
+        self.seed = header["seed"]
+        self.rendering = REPLAY_RENDER
+        # recordings made before session-clock stamps ("s") were taped
+        self.session_clock = header.get("session_clock", False)
+        random.seed(self.seed)
+
+    def _next(self, kind):
+        line = self.f.readline()
+        if not line:
+            raise EOFError(f"recording exhausted while reading '{kind}'")
+        got, value = json.loads(line)
+        if got != kind:
+            raise RuntimeError(f"replay diverged: task asked for '{kind}', recording has '{got}'")
+        return value
+
+    def sample(self, kind, fn):
+        if kind == "s" and not self.session_clock:
+            return None
+        value = self._next(kind)
+        if kind == "d":
+            for hook in FRAME_HOOKS:
+                hook()
+        return value
+
+    def ticks(self):
+        return self._next("t")
+
+    def mouse_pos(self, read=None):
+        return tuple(self._next("m"))
+
+    def flip(self, present):
+        if self.rendering:
+            present()
+        return self._next("f")
+
+    def events(self):
+        if self.rendering:
+            pygame.event.pump()
+        return [decode_event(rec) for rec in self._next("e")]
+
+    def close(self):
+        self.f.close()
+
+
+def open_tape(record_path, task, display_size):
+    # display_size is the canvas the task lays out on; replays recreate it
+    if REPLAY_PATH:
+        return ReplayInput(REPLAY_PATH)
+    return LiveInput(record_path, task, display_size)
@@ -0,0 +1,169 @@
+import os
+import re
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Hands out participant IDs with A/B counterbalancing, and collects
+# heartbeats and batched result uploads from every stimulus PC. Plain
+# HTTP/1.1 with keep-alive, so it runs (and can be tried out) on localhost.
+DATA_DIR = os.path.join(os.path.expanduser("~"), "OneDrive", "Desktop", "Mendi_vs_Octamon_Study", "Coordinator")
+DEFAULT_PORT = 8765
+STATUS_EVERY_S = 10
+# participant IDs name files under the data dir, so nothing path-like gets through
+PID_RE = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class CoordinatorState:
+    def __init__(self, data_dir=DATA_DIR, id_prefix="P"):
+        os.makedirs(data_dir, exist_ok=True)
+        self.data_dir = data_dir
+        self.id_prefix = id_prefix
+        self.lock = threading.Lock()
+        self.assign_path = os.path.join(data_dir, "assignments.json")
+        self.assignments = []
+        if os.path.exists(self.assign_path):
+            with open(self.assign_path) as f:
+                self.assignments = json.load(f)
+        self.stations = {}
+        self.started = time.time()
+
+    def _station(self, name):
+        return self.stations.setdefault(name, {"participant_id": None, "phase": None, "task": None,
+                                               "last_seen": None, "records": 0, "batches": 0})
+
+    def assign(self, station):
+        with self.lock:
+            counts = {"A": 0, "B": 0}
+            for a in self.assignments:
+                counts[a["session"]] += 1
+            # keep the two orders balanced; ties go to A
+            session = "A" if counts["A"] <= counts["B"] else "B"
+            pid = f"{self.id_prefix}{len(self.assignments) + 1:02d}"
+            entry = {"participant_id": pid, "session": session, "station": station, "assigned_unix": time.time()}
+            self.assignments.append(entry)
+            tmp = self.assign_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.assignments, f, indent=1)
+            os.replace(tmp, self.assign_path)
+            st = self._station(station)
+            st["participant_id"] = pid
+            st["last_seen"] = time.time()
+            return entry
+
+    def heartbeat(self, msg):
+        with self.lock:
+            st = self._station(msg["station"])
+            st.update(participant_id=msg.get("participant_id"), phase=msg.get("phase"),
+                      task=msg.get("task"), last_seen=time.time())
+
+    def results(self, msg):
+        records = msg.get("records", [])
+        by_pid = {}
+        for rec in records:
+            pid = rec.get("participant_id") or "unknown"
+            if not PID_RE.match(str(pid)):
+                raise ValueError(f"invalid participant_id {pid!r}")
+            by_pid.setdefault(pid, []).append(rec)
+        with self.lock:
+            for pid, recs in by_pid.items():
+                with open(os.path.join(self.data_dir, f"{pid}_results.jsonl"), "a") as f:
+                    for rec in recs:
+                        f.write(json.dumps(rec) + "\n")
+            st = self._station(msg["station"])
+            st["records"] += len(records)
+            st["batches"] += 1
+            st["last_seen"] = time.time()
+        return len(records)
+
+    def status(self):
+        now = time.time()
+        with self.lock:
+            minutes = max((now - self.started) / 60, 1e-9)
+            stations = {}
+            for name, st in self.stations.items():
+                stations[name] = dict(st, seen_s_ago=None if st["last_seen"] is None else round(now - st["last_seen"], 1),
+                                      records_per_min=round(st["records"] / minutes, 2))
+            return {"uptime_s": round(now - self.started, 1), "participants_assigned": len(self.assignments),
+                    "records_total": sum(st["records"] for st in self.stations.values()), "stations": stations}
+
+
+class CoordinatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, so stations reuse one connection
+
+    def _reply(self, code, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/status":
+            self._reply(200, self.server.state.status())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            msg = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._reply(400, {"error": "invalid json"})
+            return
+        state = self.server.state
+        if self.path == "/assign":
+            self._reply(200, state.assign(msg.get("station", "unknown")))
+        elif self.path == "/heartbeat":
+            state.heartbeat(msg)
+            self._reply(200, {"ok": True})
+        elif self.path == "/results":
+            try:
+                self._reply(200, {"stored": state.results(msg)})
+            except ValueError as e:
+                self._reply(400, {"error": str(e)})
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def make_server(host="127.0.0.1", port=DEFAULT_PORT, data_dir=DATA_DIR):
+    server = ThreadingHTTPServer((host, port), CoordinatorHandler)
+    server.daemon_threads = True
+    server.state = CoordinatorState(data_dir)
+    return server
+
+
+def print_status(status):
+    print(f"\n⏱️ up {status['uptime_s']:.0f} s | {status['participants_assigned']} assigned | "
+          f"{status['records_total']} records")
+    for name, st in sorted(status["stations"].items()):
+        seen = "never" if st["seen_s_ago"] is None else f"{st['seen_s_ago']:.0f} s ago"
+        print(f"  {name:<12} {st['participant_id'] or '-':<8} {(st['phase'] or '-'):<12} {(st['task'] or ''):<8} "
+              f"{st['records']:>6} rec  {st['records_per_min']:>7.1f}/min  seen {seen}")
+
+
+def serve(host, port, data_dir):
+    server = make_server(host, port, data_dir)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"🛰️ Coordinator listening on http://{host}:{port} (data in {data_dir})")
+    try:
+        while True:
+            time.sleep(STATUS_EVERY_S)
+            print_status(server.state.status())
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lab coordinator for parallel stimulus stations")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.data_dir)
@@ -0,0 +1,229 @@
+import os
+import sys
+import csv
+import json
+import time
+import queue
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+from urllib.parse import urlsplit
+import session_manifest
+import lab_coordinator
+
+# Station side of lab_coordinator.py. Results are queued and uploaded in
+# batches by a background thread over a kept-alive connection; anything that
+# cannot be delivered is spooled to disk and resent once the coordinator is
+# reachable again, so a session never waits on the network.
+codes_dir = os.path.dirname(os.path.abspath(__file__))
+SESSION_SCRIPTS = {
+    "A": os.path.join(codes_dir, "A_FNIRS_session.py"),
+    "B": os.path.join(codes_dir, "B_FNIRS_session.py"),
+}
+SPOOL_DIR = os.path.join(os.path.expanduser("~"), "OneDrive", "Desktop", "Mendi_vs_Octamon_Study", "Station_Spool")
+BATCH_SIZE = 50
+BATCH_WAIT_S = 2.0
+HEARTBEAT_S = 5.0
+TIMEOUT_S = 3.0
+
+
+class StationClient:
+    def __init__(self, url, station, participant_id=None, spool_dir=SPOOL_DIR):
+        parts = urlsplit(url if "://" in url else f"http://{url}")
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.station = station
+        self.participant_id = participant_id
+        self.phase = self.task = None
+        os.makedirs(spool_dir, exist_ok=True)
+        self.spool_path = os.path.join(spool_dir, f"{station}_spool.jsonl")
+        self._pool = queue.LifoQueue()
+        self._outbox = queue.Queue()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        # guards the spool file and the batch the uploader is holding
+        self._lock = threading.Lock()
+        self._inflight = []
+        self._closed = False
+        self._threads = [threading.Thread(target=self._upload_loop, daemon=True),
+                         threading.Thread(target=self._heartbeat_loop, daemon=True)]
+        for t in self._threads:
+            t.start()
+
+    def _request(self, method, path, payload=None):
+        # one pooled keep-alive connection per concurrent caller; broken ones are dropped
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=TIMEOUT_S)
+        try:
+            body = json.dumps(payload).encode() if payload is not None else None
+            conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            data = json.loads(resp.read() or b"{}")
+            if resp.status != 200:
+                raise OSError(f"coordinator replied {resp.status}: {data}")
+            self._pool.put(conn)
+            return data
+        except (OSError, http.client.HTTPException, ValueError):
+            conn.close()
+            raise
+
+    def assign(self):
+        try:
+            return self._request("POST", "/assign", {"station": self.station})
+        except (OSError, http.client.HTTPException, ValueError) as e:
+            print(f"⚠️ Coordinator unreachable ({e})")
+            return None
+
+    def send(self, kind, **fields):
+        self._outbox.put(dict(fields, kind=kind, station=self.station,
+                              participant_id=self.participant_id, sent_unix=time.time()))
+
+    def heartbeat(self, phase=None, task=None):
+        # never blocks the caller; the heartbeat thread sends it right away
+        self.phase, self.task = phase, task
+        self._wake.set()
+
+    def _beat(self):
+        try:
+            self._request("POST", "/heartbeat", {"station": self.station, "participant_id": self.participant_id,
+                                                 "phase": self.phase, "task": self.task})
+        except (OSError, http.client.HTTPException, ValueError):
+            pass
+
+    def _heartbeat_loop(self):
+        while not self._stop.is_set():
+            self._beat()
+            self._wake.wait(HEARTBEAT_S)
+            self._wake.clear()
+
+    def _post_batch(self, batch):
+        try:
+            self._request("POST", "/results", {"station": self.station, "records": batch})
+            return True
+        except (OSError, http.client.HTTPException, ValueError):
+            return False
+
+    def _spool(self, records):
+        # appends only; callers hold self._lock
+        if records:
+            with open(self.spool_path, "a") as f:
+                for rec in records:
+                    f.write(json.dumps(rec) + "\n")
+
+    def _read_spool(self):
+        if not os.path.exists(self.spool_path):
+            return []
+        with open(self.spool_path) as f:
+            return [line for line in f if line.strip()]
+
+    def _drop_spooled(self, n):
+        # the first n lines were delivered; rewrite the rest atomically so a crash never loses records
+        rest = self._read_spool()[n:]
+        if not rest:
+            os.remove(self.spool_path)
+            return
+        tmp = self.spool_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.writelines(rest)
+        os.replace(tmp, self.spool_path)
+
+    def _flush_spool(self):
+        with self._lock:
+            pending = [json.loads(line) for line in self._read_spool()]
+        for i in range(0, len(pending), BATCH_SIZE):
+            batch = pending[i:i + BATCH_SIZE]
+            if not self._post_batch(batch):
+                return False
+            with self._lock:
+                self._drop_spooled(len(batch))
+        return True
+
+    def _upload_loop(self):
+        while True:
+            deadline = time.monotonic() + BATCH_WAIT_S
+            while len(self._inflight) < BATCH_SIZE:
+                try:
+                    rec = self._outbox.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                with self._lock:
+                    if self._closed:
+                        self._spool([rec])
+                        return
+                    self._inflight.append(rec)
+            # older spooled records go first so the coordinator sees them in order
+            flushed = self._flush_spool()
+            if self._inflight:
+                ok = flushed and self._post_batch(list(self._inflight))
+                with self._lock:
+                    if self._closed:
+                        return   # close() already spooled the batch
+                    if not ok:
+                        self._spool(self._inflight)
+                    self._inflight = []
+            if self._stop.is_set() and self._outbox.empty():
+                return
+
+    def close(self, timeout=TIMEOUT_S * 2):
+        self._stop.set()
+        self._wake.set()
+        self._threads[0].join(timeout)
+        with self._lock:
+            # whatever the uploader still holds or hasn't picked up goes to disk behind the spool
+            self._closed = True
+            leftover, self._inflight = self._inflight, []
+            while True:
+                try:
+                    leftover.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+            self._spool(leftover)
+            spooled = os.path.exists(self.spool_path)
+        if spooled:
+            print(f"📦 Results kept offline in {self.spool_path}; they are sent on the next connection")
+
+
+def send_task_outputs(client, manifest_path, task):
+    # streams the CSVs a task just wrote; the manifest keeps earlier runs and resumes, so only the newest entry
+    entries = [e for e in session_manifest.read_manifest(manifest_path) if e["task"] == task]
+    if not entries:
+        return
+    for kind in ("summary", "trials"):
+        path = entries[-1].get(kind)
+        if path and os.path.exists(path):
+            with open(path, newline="") as f:
+                client.send(f"{task}_{kind}", file=os.path.basename(path), rows=list(csv.reader(f)))
+
+
+def connect_from_env(participant_id):
+    # set by the station launcher below; absent when a session is started by hand
+    url = os.environ.get("MVO_COORDINATOR")
+    if not url:
+        return None
+    return StationClient(url, os.environ.get("MVO_STATION", socket.gethostname()), participant_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run one participant on this station via the coordinator")
+    parser.add_argument("coordinator", help="e.g. http://10.0.0.5:8765")
+    parser.add_argument("--station", default=socket.gethostname())
+    args = parser.parse_args()
+
+    client = StationClient(args.coordinator, args.station)
+    assignment = client.assign()
+    if assignment is None:
+        # offline: the operator picks ID and order, results are spooled until the coordinator returns
+        pid = session = ""
+        while not lab_coordinator.PID_RE.match(pid):
+            pid = input("Enter participant ID (letters, digits, _ or -): ").strip()
+        while session not in SESSION_SCRIPTS:
+            session = input("Session order (A/B): ").strip().upper() or "A"
+    else:
+        pid, session = assignment["participant_id"], assignment["session"]
+        print(f"🎫 Assigned {pid} to session {session}")
+    client.close()
+    env = dict(os.environ, MVO_COORDINATOR=args.coordinator, MVO_STATION=args.station)
+    sys.exit(subprocess.run([sys.executable, SESSION_SCRIPTS[session], pid], env=env).returncode)
@@ -0,0 +1,172 @@
+import os
+import sys
+import random
+import argparse
+import numpy as np
+
+# Constraint-checked n-back sequences, generated in vectorized batches.
+# MVO_SEQUENCES opts the games in:
+#   constrained   - draw a fresh validated sequence at start-up
+#   <path>.npz    - pick one from a bank written by `python nback_sequences.py`
+# Unset keeps the original greedy generators in the games.
+MODE = os.environ.get("MVO_SEQUENCES", "")
+LETTERS = np.array(list("ABCDEFGHIJKLMNOPQRSTUVWXYZ"))
+BATCH = 4096
+MAX_RUN = 8          # longest allowed stretch of consecutive non-match trials
+MAX_PER_LETTER = 5   # no letter shown more often than this in one sequence
+RESAMPLE_ROUNDS = 8
+
+
+def _match_flags(rng, batch, n, trials, target):
+    # exactly `target` matches, never two in a row, none before trial n:
+    # pick sorted slots in a shrunk range and spread them out by their rank
+    slots = trials - n - (target - 1)
+    picks = np.sort(rng.random((batch, slots)).argsort(axis=1)[:, :target], axis=1)
+    pos = picks + np.arange(target) + n
+    flags = np.zeros((batch, trials), bool)
+    np.put_along_axis(flags, pos, True, axis=1)
+    return flags
+
+
+def _lure_lags(rng, flags, n, lures):
+    # assign the requested number of k-back lures (k < n) to non-match trials
+    batch, trials = flags.shape
+    lag = np.zeros((batch, trials), np.int8)
+    for k, count in sorted(lures.items()):
+        if not count:
+            continue
+        score = rng.random((batch, trials))
+        score[:, :n] = np.inf
+        score[flags | (lag > 0)] = np.inf
+        np.put_along_axis(lag, score.argsort(axis=1)[:, :count], k, axis=1)
+    return lag
+
+
+def _clashes(col, back):
+    clash = np.zeros(len(col), bool)
+    for b in back:
+        clash |= col == b
+    return clash
+
+
+def _letters(rng, flags, lag, n):
+    batch, trials = flags.shape
+    seq = np.zeros((batch, trials), np.int8)
+    ok = np.ones(batch, bool)
+    size = len(LETTERS)
+    for i in range(trials):
+        back = [seq[:, i - j] for j in range(1, min(n, i) + 1)]
+        col = rng.integers(0, size, batch).astype(np.int8)
+        # free trials avoid every letter 1..n back, so no stray matches or lures;
+        # a few vectorized redraws clear the (at most n/26) collisions per round
+        clash = _clashes(col, back)
+        for _ in range(RESAMPLE_ROUNDS):
+            if not clash.any():
+                break
+            col[clash] = rng.integers(0, size, clash.sum())
+            clash = _clashes(col, back)
+        ok &= ~clash | flags[:, i] | (lag[:, i] > 0)
+        if i >= n:
+            col = np.where(flags[:, i], seq[:, i - n], col)
+        for k in range(1, n):
+            if i >= k:
+                col = np.where(lag[:, i] == k, seq[:, i - k], col)
+        seq[:, i] = col
+    return seq, ok
+
+
+def _runs_ok(flags, n, max_run):
+    # longest gap between consecutive matches (and the ends) on scorable trials
+    batch, trials = flags.shape
+    idx = np.where(flags, np.arange(trials), -1)
+    edges = np.concatenate([np.full((batch, 1), n - 1), np.sort(idx, axis=1), np.full((batch, 1), trials)], axis=1)
+    edges = np.maximum.accumulate(edges, axis=1)
+    return (np.diff(edges, axis=1) - 1).max(axis=1) <= max_run
+
+
+def validate(seq, n, target, lures, max_run=MAX_RUN, max_per_letter=MAX_PER_LETTER):
+    # recomputes every constraint from the letters alone
+    match = np.zeros(seq.shape, bool)
+    match[:, n:] = seq[:, n:] == seq[:, :-n]
+    ok = match.sum(axis=1) == target
+    ok &= ~(match[:, 1:] & match[:, :-1]).any(axis=1)
+    for k in range(1, n):
+        lure = np.zeros(seq.shape, bool)
+        lure[:, k:] = (seq[:, k:] == seq[:, :-k]) & ~match[:, k:]
+        ok &= lure.sum(axis=1) == lures.get(k, 0)
+    ok &= _runs_ok(match, n, max_run)
+    counts = (seq[:, :, None] == np.arange(len(LETTERS))).sum(axis=1)
+    ok &= counts.max(axis=1) <= max_per_letter
+    return ok
+
+
+def generate(n, trials, ratio, count=1, lures=None, seed=None,
+             max_run=MAX_RUN, max_per_letter=MAX_PER_LETTER, max_batches=200):
+    lures = lures or {}
+    target = int(trials * ratio)
+    rng = np.random.default_rng(seed)
+    found = []
+    total = 0
+    for _ in range(max_batches):
+        flags = _match_flags(rng, BATCH, n, trials, target)
+        lag = _lure_lags(rng, flags, n, lures)
+        seq, ok = _letters(rng, flags, lag, n)
+        ok &= validate(seq, n, target, lures, max_run, max_per_letter)
+        found.append(seq[ok])
+        total += int(ok.sum())
+        if total >= count:
+            break
+    if total < count:
+        raise RuntimeError(f"only {total}/{count} sequences met the constraints; relax max_run/max_per_letter")
+    return np.concatenate(found)[:count]
+
+
+def decode(row, n):
+    letters = [str(LETTERS[c]) for c in row]
+    matches = [i >= n and letters[i] == letters[i - n] for i in range(len(letters))]
+    return letters, matches
+
+
+def draw(n, trials, ratio, lures=None):
+    # seeded from the task's `random`, which the input tape seeds, so replays get the same sequence
+    if MODE == "constrained":
+        row = generate(n, trials, ratio, lures=lures, seed=random.getrandbits(64))[0]
+        return decode(row, n)
+    bank = np.load(MODE)
+    if int(bank["n"]) != n or bank["sequences"].shape[1] != trials:
+        raise ValueError(f"{MODE} holds {int(bank['n'])}-back sequences of {bank['sequences'].shape[1]} trials, "
+                         f"not {n}-back/{trials}")
+    # the bank must have been built for this task's match count and lures, not just its n and length
+    bank_lures = {int(k): int(v) for k, v in bank["lures"] if v}
+    want_lures = {k: v for k, v in (lures or {}).items() if v}
+    if int(trials * float(bank["ratio"])) != int(trials * ratio) or bank_lures != want_lures:
+        raise ValueError(f"{MODE} was built with ratio {float(bank['ratio'])} and lures {bank_lures}, "
+                         f"not ratio {ratio} and lures {want_lures}")
+    return decode(bank["sequences"][random.randrange(len(bank["sequences"]))], n)
+
+
+def parse_lures(items):
+    # "1=2" -> two 1-back lures
+    return {int(k): int(v) for k, v in (item.split("=") for item in items)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build a bank of validated n-back sequences")
+    parser.add_argument("n", type=int)
+    parser.add_argument("--trials", type=int, required=True)
+    parser.add_argument("--ratio", type=float, default=0.3)
+    parser.add_argument("--lure", action="append", default=[], help="lag=count, e.g. --lure 1=2 --lure 2=2")
+    parser.add_argument("--size", type=int, default=1000)
+    parser.add_argument("--max-run", type=int, default=MAX_RUN)
+    parser.add_argument("--max-per-letter", type=int, default=MAX_PER_LETTER)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--out", default=None)
+    args = parser.parse_args()
+    lures = parse_lures(args.lure)
+    if any(k < 1 or k >= args.n for k in lures):
+        sys.exit(f"lure lags must be between 1 and {args.n - 1}")
+    seqs = generate(args.n, args.trials, args.ratio, args.size, lures, args.seed, args.max_run, args.max_per_letter)
+    out = args.out or f"nback{args.n}_{args.trials}_bank.npz"
+    np.savez_compressed(out, sequences=seqs, n=args.n, ratio=args.ratio,
+                        lures=np.array(sorted(lures.items()), dtype=np.int64).reshape(-1, 2))
+    print(f"✅ {len(seqs)} validated {args.n}-back sequences of {args.trials} trials saved to {out}")
@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import time
+import ctypes
+import ctypes.util
+
+# MVO_REALTIME=1 asks for real-time scheduling in the three tasks (children
+# inherit the environment). The session runner only locks its memory: a
+# policy or affinity set there would be inherited by every task it spawns.
+# Each step is tried in turn and simply skipped when the OS or missing
+# privileges refuse it; what was actually achieved is appended to
+# MVO_RT_REPORT as one JSON line per process.
+REALTIME = os.environ.get("MVO_REALTIME", "0") == "1"
+RT_PRIORITY = int(os.environ.get("MVO_RT_PRIORITY", "10"))
+NICE_FALLBACK = -10
+MCL_CURRENT, MCL_FUTURE = 1, 2
+LATENCY_SAMPLES = 200
+
+
+def _render_core():
+    # MVO_RT_CORES="3" picks the core for the task's main thread, which renders
+    # and polls input; defaults to the highest CPU when there are more than two
+    if os.environ.get("MVO_RT_CORES"):
+        return int(os.environ["MVO_RT_CORES"].split(",")[0])
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    cpus = sorted(os.sched_getaffinity(0))
+    return cpus[-1] if len(cpus) > 2 else None
+
+
+def _set_scheduler():
+    if not hasattr(os, "sched_setscheduler"):
+        return {"policy": "unsupported"}
+    for name in ("SCHED_FIFO", "SCHED_RR"):
+        policy = getattr(os, name)
+        prio = max(os.sched_get_priority_min(policy), min(RT_PRIORITY, os.sched_get_priority_max(policy)))
+        try:
+            os.sched_setscheduler(0, policy, os.sched_param(prio))
+            return {"policy": name, "priority": prio}
+        except OSError as e:
+            last_error = str(e)
+    try:
+        os.setpriority(os.PRIO_PROCESS, 0, NICE_FALLBACK)
+        return {"policy": "SCHED_OTHER", "nice": NICE_FALLBACK, "rt_error": last_error}
+    except OSError as e:
+        return {"policy": "SCHED_OTHER", "nice": os.getpriority(os.PRIO_PROCESS, 0),
+                "rt_error": last_error, "nice_error": str(e)}
+
+
+def pin_current_thread():
+    core = _render_core()
+    if not REALTIME or not hasattr(os, "sched_setaffinity") or core is None:
+        return None
+    try:
+        # pid 0 is the calling thread on Linux, so this pins just this thread;
+        # the profiler and writer threads are started before and keep every core
+        os.sched_setaffinity(0, {core})
+        return core
+    except OSError:
+        return None
+
+
+def _lock_memory():
+    libc_name = ctypes.util.find_library("c")
+    if not libc_name or not sys.platform.startswith("linux"):
+        return "unsupported"
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+    if libc.mlockall(MCL_CURRENT | MCL_FUTURE) == 0:
+        return "locked"
+    return os.strerror(ctypes.get_errno())
+
+
+def measure_latency(samples=LATENCY_SAMPLES, sleep_s=0.001):
+    # wake-up overshoot of a 1 ms sleep is a direct read of scheduling latency
+    over = []
+    for _ in range(samples):
+        t0 = time.perf_counter()
+        time.sleep(sleep_s)
+        over.append((time.perf_counter() - t0 - sleep_s) * 1e6)
+    over.sort()
+    return {"median_us": round(over[len(over) // 2], 1),
+            "p99_us": round(over[min(len(over) - 1, int(len(over) * 0.99))], 1),
+            "max_us": round(over[-1], 1)}
+
+
+def enable(role, schedule=True):
+    # the session runner passes schedule=False so its tasks start on every core under the default policy
+    if not REALTIME:
+        return None
+    report = {"process": role, "pid": os.getpid(), "unix": time.time()}
+    report["latency_before"] = measure_latency()
+    if schedule:
+        report.update(_set_scheduler())
+        report["render_core"] = pin_current_thread()
+    else:
+        report.update(policy="unchanged", render_core=None)
+    report["mlockall"] = _lock_memory()
+    report["latency_after"] = measure_latency()
+    print(f"⚡ Real-time mode ({role}): {report['policy']}, core {report['render_core']}, "
+          f"mlockall {report['mlockall']}, wake-up p99 {report['latency_after']['p99_us']} µs")
+    # read late: the session runner sets the report path after importing this module
+    report_path = os.environ.get("MVO_RT_REPORT")
+    if report_path:
+        with open(report_path, "a") as f:
+            f.write(json.dumps(report) + "\n")
+    return report
@@ -0,0 +1,146 @@
+import os
+from collections import OrderedDict
+import pygame
+import frame_timing
+
+# MVO_RENDERER selects how a session draws:
+#   surface       - software Surface blits + pygame.display.flip() (default)
+#   sdl2          - pygame._sdl2 Renderer with glyphs/sprites uploaded once as textures
+#   sdl2-software - same Renderer path forced onto SDL's software renderer (no GPU needed)
+RENDERER = os.environ.get("MVO_RENDERER", "surface").lower()
+# glyphs/textures kept per backend; least recently drawn ones are dropped past this
+CACHE_LIMIT = 256
+
+
+def _cached(cache, key, make):
+    # small LRU: typed text (ratings, IDs) would otherwise grow the cache without bound
+    item = cache.get(key)
+    if item is None:
+        item = cache[key] = make()
+        if len(cache) > CACHE_LIMIT:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return item
+
+
+class SurfaceBackend:
+    def __init__(self, screen):
+        self.screen = screen
+        self.size = screen.get_size()
+        self._glyphs = OrderedDict()
+
+    def clear(self, color):
+        self.screen.fill(color)
+
+    def text(self, text, font, color, center, alpha=255):
+        # rendered once per (text, font, colour) so the frame loop doesn't allocate surfaces
+        surf = _cached(self._glyphs, (text, font, color), lambda: font.render(text, True, color))
+        surf.set_alpha(alpha if alpha < 255 else None)
+        self.screen.blit(surf, surf.get_rect(center=center))
+
+    def rect(self, color, rect, width=0, radius=0):
+        pygame.draw.rect(self.screen, color, rect, width, border_radius=radius)
+
+    def line(self, color, start, end, width=1):
+        pygame.draw.line(self.screen, color, start, end, width)
+
+    def circle(self, color, center, radius, width=0):
+        pygame.draw.circle(self.screen, color, center, radius, width)
+
+    def mouse_pos(self):
+        # pygame already maps the pointer into SCALED's logical canvas
+        return pygame.mouse.get_pos()
+
+    def present(self):
+        pygame.display.flip()
+
+
+class TextureBackend:
+    def __init__(self, caption, software=False):
+        from pygame._sdl2.video import Window, Renderer, Texture
+        self._texture_cls = Texture
+        if frame_timing.DISPLAY_SIZE:
+            self.window = Window(caption, size=frame_timing.DISPLAY_SIZE)
+        else:
+            self.window = Window(caption, fullscreen_desktop=True)
+        self.renderer = Renderer(self.window, accelerated=0 if software else 1,
+                                 vsync=frame_timing.VSYNC_MODE)
+        self.size = self.window.size
+        if frame_timing.LOGICAL_SIZE:
+            self.renderer.logical_size = frame_timing.LOGICAL_SIZE
+            self.size = frame_timing.LOGICAL_SIZE
+        self._textures = OrderedDict()
+
+    def _texture(self, key, make_surface):
+        # every glyph/sprite is rasterised and uploaded once, then only composited
+        return _cached(self._textures, key, lambda: self._texture_cls.from_surface(self.renderer, make_surface()))
+
+    def _blit(self, tex, center, alpha=255):
+        tex.alpha = alpha
+        rect = tex.get_rect(center=center)
+        tex.draw(dstrect=rect)
+
+    def clear(self, color):
+        self.renderer.draw_color = (*color, 255)
+        self.renderer.clear()
+
+    def text(self, text, font, color, center, alpha=255):
+        if not text:
+            return
+        tex = self._texture(("text", text, font, color), lambda: font.render(text, True, color))
+        self._blit(tex, center, alpha)
+
+    def rect(self, color, rect, width=0, radius=0):
+        rect = pygame.Rect(rect)
+        if width == 0 and radius == 0:
+            self.renderer.draw_color = (*color, 255)
+            self.renderer.fill_rect(rect)
+            return
+
+        def make():
+            surf = pygame.Surface(rect.size, pygame.SRCALPHA)
+            pygame.draw.rect(surf, color, surf.get_rect(), width, border_radius=radius)
+            return surf
+        tex = self._texture(("rect", color, rect.size, width, radius), make)
+        tex.alpha = 255
+        tex.draw(dstrect=rect)
+
+    def line(self, color, start, end, width=1):
+        (x0, y0), (x1, y1) = start, end
+        self.renderer.draw_color = (*color, 255)
+        # the tasks only draw axis-aligned lines, which map onto a single fill_rect
+        if y0 == y1:
+            self.renderer.fill_rect((min(x0, x1), int(y0) - width // 2, abs(x1 - x0) + 1, width))
+        elif x0 == x1:
+            self.renderer.fill_rect((int(x0) - width // 2, min(y0, y1), width, abs(y1 - y0) + 1))
+        else:
+            self.renderer.draw_line(start, end)
+
+    def circle(self, color, center, radius, width=0):
+        def make():
+            surf = pygame.Surface((radius * 2 + 2, radius * 2 + 2), pygame.SRCALPHA)
+            pygame.draw.circle(surf, color, (radius + 1, radius + 1), radius, width)
+            return surf
+        self._blit(self._texture(("circle", color, radius, width), make), center)
+
+    def mouse_pos(self):
+        # undo the renderer's letterboxed scale, which mouse.get_pos() doesn't see
+        x, y = pygame.mouse.get_pos()
+        if self.size == self.window.size:
+            return x, y
+        (ww, wh), (lw, lh) = self.window.size, self.size
+        scale = min(ww / lw, wh / lh)
+        return int((x - (ww - lw * scale) / 2) / scale), int((y - (wh - lh * scale) / 2) / scale)
+
+    def present(self):
+        self.renderer.present()
+
+
+def open_display(caption):
+    if RENDERER in ("sdl2", "sdl2-software"):
+        try:
+            return TextureBackend(caption, software=RENDERER == "sdl2-software")
+        except Exception as e:
+            print(f"⚠️ {RENDERER} renderer unavailable ({e}), falling back to Surface rendering")
+    return SurfaceBackend(frame_timing.open_display(caption))
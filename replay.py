@@ -0,0 +1,81 @@
+import os
+import sys
+import json
+import glob
+import time
+import runpy
+import argparse
+from multiprocessing import Pool
+
+# Re-runs recorded sessions (the *_inputs.jsonl files written next to each
+# task's results) through the unchanged task code on a virtual clock, writing
+# freshly scored results into --out. Without --render nothing is drawn and
+# nothing sleeps, so a replay runs as fast as the task logic allows.
+codes_dir = os.path.dirname(os.path.abspath(__file__))
+TASK_SCRIPTS = {
+    "1-back": os.path.join(codes_dir, "oneback_game.py"),
+    "3-back": os.path.join(codes_dir, "threeback_game.py"),
+    "balloon": os.path.join(codes_dir, "red_balloon_shoot_game.py"),
+}
+
+
+def prepare(recording, out_dir, render=False):
+    # must run before any task module (or input_tape/frame_timing) is imported
+    with open(recording) as f:
+        header = json.loads(f.readline())
+    script = TASK_SCRIPTS[header["task"]]
+    os.makedirs(out_dir, exist_ok=True)
+    os.environ["MVO_REPLAY"] = os.path.abspath(recording)
+    os.environ["MVO_REPLAY_RENDER"] = "1" if render else "0"
+    os.environ["MVO_OUTPUT_DIR"] = os.path.abspath(out_dir)
+    os.environ["MVO_VSYNC"] = "1" if header.get("vsync") else "0"
+    # task layout follows the canvas size, so replays must use the recorded one
+    logical_res = header.get("logical_res", "")
+    size = header.get("display_size")
+    display_res = f"{size[0]}x{size[1]}" if size else ""
+    if logical_res and display_res and logical_res.lower() != display_res:
+        logical_res = ""   # the scaled display wasn't available live; the task ran at native size
+    os.environ["MVO_LOGICAL_RES"] = logical_res
+    os.environ["MVO_DISPLAY_SIZE"] = "" if logical_res else display_res
+    os.environ["MVO_SEQUENCES"] = header.get("sequences", "")
+    if not render:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    sys.argv = [script] + header["argv"]
+    return script
+
+
+def replay(recording, out_dir, render=False):
+    script = prepare(recording, out_dir, render)
+    start = time.perf_counter()
+    runpy.run_path(script, run_name="__main__")
+    return recording, time.perf_counter() - start
+
+
+def replay_many(recordings, out_dir, workers=None):
+    # task modules keep their state at module level, so every replay gets a fresh process
+    with Pool(workers, maxtasksperchild=1) as pool:
+        return pool.starmap(replay, [(r, out_dir) for r in recordings])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded task inputs and re-score them")
+    parser.add_argument("recordings", nargs="+", help="*_inputs.jsonl files or glob patterns")
+    parser.add_argument("--out", default="replayed_results")
+    parser.add_argument("--render", action="store_true", help="draw frames while replaying (single recording only)")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    paths = sorted(p for pattern in args.recordings for p in glob.glob(pattern))
+    if not paths:
+        sys.exit("No recordings matched.")
+    if args.render and len(paths) > 1:
+        sys.exit(f"--render replays one recording at a time ({len(paths)} matched).")
+    start = time.perf_counter()
+    if args.render or len(paths) == 1:
+        results = [replay(paths[0], args.out, render=args.render)]
+    else:
+        results = replay_many(paths, args.out, args.workers)
+    for path, secs in results:
+        print(f"🔁 {os.path.basename(path)} replayed in {secs:.2f} s")
+    print(f"✅ {len(results)} recording(s) re-scored into {args.out} in {time.perf_counter() - start:.2f} s")
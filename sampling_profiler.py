@@ -0,0 +1,94 @@
+import os
+import sys
+import json
+import time
+import threading
+
+# MVO_PROFILE=1 samples the main thread's Python stack from a side thread
+# (MVO_PROFILE_HZ times a second) in the session runner and every task. Each
+# sample is tagged with the current phase; on stop, one collapsed-stack file
+# per phase (<base>_profile_<phase>.folded, the input flamegraph.pl and
+# speedscope take) and a JSON summary with the sampler's own cost are written.
+PROFILE = os.environ.get("MVO_PROFILE", "0") == "1"
+SAMPLE_HZ = float(os.environ.get("MVO_PROFILE_HZ", "250"))
+FRAME_BUDGET_MS = 1000 / 60
+
+_phase = "setup"
+
+
+def set_phase(name):
+    global _phase
+    _phase = name
+
+
+class SamplingProfiler:
+    def __init__(self, base_path, hz=SAMPLE_HZ):
+        self.base_path = base_path
+        self.interval = 1.0 / hz
+        self.target = threading.main_thread().ident
+        self.counts = {}
+        self.samples = 0
+        self.busy = 0.0
+        self.worst = 0.0
+        self._stop = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread.start()
+        return self
+
+    def _run(self):
+        clock = time.perf_counter
+        while not self._stop.wait(self.interval):
+            t0 = clock()
+            frame = sys._current_frames().get(self.target)
+            stack = []
+            while frame is not None:
+                stack.append((frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            # strings are only built when writing; a sample is a dict bump
+            key = (_phase, tuple(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+            cost = clock() - t0
+            self.busy += cost
+            self.worst = max(self.worst, cost)
+            self.samples += 1
+
+    def stop(self):
+        self._stop.set()
+        self.thread.join()
+        wall = time.perf_counter() - self.started
+        folded = {}
+        for (phase, stack), n in self.counts.items():
+            line = ";".join(f"{code.co_name} ({os.path.basename(code.co_filename)}:{lineno or 0})"
+                            for code, lineno in reversed(stack))
+            lines = folded.setdefault(phase, {})
+            lines[line] = lines.get(line, 0) + n
+        for phase, lines in folded.items():
+            with open(f"{self.base_path}_profile_{phase}.folded", "w") as f:
+                for line, n in sorted(lines.items()):
+                    f.write(f"{line} {n}\n")
+        summary = {
+            "sample_hz": round(1.0 / self.interval, 1), "samples": self.samples, "wall_s": round(wall, 2),
+            "samples_per_phase": {p: sum(lines.values()) for p, lines in folded.items()},
+            # the sampler holds the GIL while it walks the stack, so this is time taken from the task
+            "mean_sample_us": round(self.busy / max(self.samples, 1) * 1e6, 1),
+            "worst_sample_us": round(self.worst * 1e6, 1),
+            "overhead_pct": round(self.busy / wall * 100, 3) if wall else 0.0,
+            "overhead_ms_per_frame": round(self.busy / wall * FRAME_BUDGET_MS, 4) if wall else 0.0,
+            "frame_budget_ms": round(FRAME_BUDGET_MS, 2),
+        }
+        self.summary_path = f"{self.base_path}_profile.json"
+        with open(self.summary_path, "w") as f:
+            json.dump(summary, f, indent=1)
+        ok = self.worst * 1000 < FRAME_BUDGET_MS
+        print(f"{'🔬' if ok else '⚠️'} Profile: {self.samples} samples in {len(folded)} phase(s), "
+              f"{summary['overhead_pct']}% overhead, worst sample {summary['worst_sample_us']} µs -> {self.summary_path}")
+        return summary
+
+
+def start(base_path):
+    if not PROFILE:
+        return None
+    return SamplingProfiler(base_path).start()
@@ -0,0 +1,117 @@
+import os
+import sys
+import json
+import glob
+import time
+import subprocess
+import session_timeline
+import session_manifest
+
+# Progress of a session runner, rewritten atomically after every task and
+# rating: which steps are done, the ratings given, and each task's manifest
+# entry (seed and output paths). `python A_FNIRS_session.py <pid> --resume`
+# skips every finished step and picks up at the first unfinished one.
+RESUME_FLAG = "--resume"
+
+
+def checkpoint_path(participant_id, folder=session_timeline.TIMELINE_DIR):
+    return os.path.join(folder, f"{participant_id}_checkpoint.json")
+
+
+def latest_unfinished(folder=session_timeline.TIMELINE_DIR):
+    # participant of the most recently touched unfinished session, for --resume without an ID
+    paths = sorted(glob.glob(os.path.join(folder, "*_checkpoint.json")), key=os.path.getmtime, reverse=True)
+    for path in paths:
+        with open(path) as f:
+            state = json.load(f)
+        if not state.get("finished"):
+            return state["participant_id"]
+    return None
+
+
+class Checkpoint:
+    def __init__(self, participant_id, session, order, resume=False, folder=session_timeline.TIMELINE_DIR):
+        os.makedirs(folder, exist_ok=True)
+        self.path = checkpoint_path(participant_id, folder)
+        self.state = None
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                saved = json.load(f)
+            if resume:
+                self.state = saved
+            elif not saved.get("finished"):
+                print(f"⚠️ {participant_id} has an unfinished session; starting over (use {RESUME_FLAG} to continue it)")
+        if self.state is None:
+            self.state = {"participant_id": participant_id, "session": session, "order": order,
+                          "completed": [], "ratings": {}, "tasks": {}, "failures": [],
+                          "started_unix": time.time(), "finished": False}
+            self._save()
+
+    def _save(self):
+        self.state["updated_unix"] = time.time()
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.state, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def done(self, step):
+        return step in self.state["completed"]
+
+    def _complete(self, step):
+        if step not in self.state["completed"]:
+            self.state["completed"].append(step)
+        self._save()
+
+    def task_done(self, task, manifest_path):
+        entries = [e for e in session_manifest.read_manifest(manifest_path) if e.get("task") == task]
+        if entries:
+            self.state["tasks"][task] = entries[-1]
+        self._complete(f"{task}:task")
+
+    def rating_done(self, task, rating):
+        self.state["ratings"][task] = rating
+        self._complete(f"{task}:rating")
+
+    def failed(self, task, returncode):
+        self.state["failures"].append({"task": task, "returncode": returncode, "unix": time.time()})
+        self._save()
+
+    def finish(self):
+        self.state["finished"] = True
+        self._complete("final")
+
+    def session_zero(self):
+        # keep the session timebase across a resume when the machine hasn't rebooted
+        zero, zero_unix = self.state.get("session_zero"), self.state.get("session_zero_unix")
+        if zero is None or abs((time.time() - zero_unix) - (time.perf_counter() - zero)) > 1.0:
+            return None, None
+        return zero, zero_unix
+
+    def set_session_zero(self, zero, zero_unix):
+        self.state["session_zero"], self.state["session_zero_unix"] = zero, zero_unix
+        self._save()
+
+
+def parse_args(argv):
+    # [participant_id] [--resume]; the ID is prompted for (or taken from the checkpoint) when missing
+    resume = RESUME_FLAG in argv
+    rest = [a for a in argv if a != RESUME_FLAG]
+    participant_id = rest[0] if rest else None
+    if participant_id is None and resume:
+        participant_id = latest_unfinished()
+        if participant_id:
+            print(f"🔁 Resuming the latest unfinished session: {participant_id}")
+    return participant_id, resume
+
+
+def hand_over(participant_id, session, scripts):
+    # a resumed participant keeps their counterbalancing order: run the other runner if needed
+    path = checkpoint_path(participant_id)
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        saved = json.load(f)
+    if saved["session"] != session and not saved.get("finished"):
+        print(f"🔁 {participant_id} was assigned session {saved['session']}, switching runner")
+        result = subprocess.run([sys.executable, scripts[saved["session"]], participant_id, RESUME_FLAG])
+        sys.exit(result.returncode)
@@ -0,0 +1,24 @@
+import os
+import json
+import time
+import clock_sync
+
+# The session runner points MVO_MANIFEST at a JSON-lines file; every task
+# appends one line naming the files it wrote, so the runner knows exactly
+# which outputs belong to this session without guessing versioned filenames.
+MANIFEST_PATH = os.environ.get("MVO_MANIFEST")
+
+
+def record_outputs(task, **entry):
+    if not MANIFEST_PATH:
+        return
+    entry = dict(entry, task=task, finished_unix=time.time(), finished_session_s=clock_sync.session_time())
+    with open(MANIFEST_PATH, "a") as f:
+        f.write(json.dumps(entry) + "\n")
+
+
+def read_manifest(path):
+    if not path or not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,68 @@
+import os
+import csv
+import time
+from contextlib import contextmanager
+import snirf_events
+import sampling_profiler
+import clock_sync
+
+TIMELINE_DIR = os.path.join(os.path.expanduser("~"), "OneDrive", "Desktop", "Mendi_vs_Octamon_Study", "Session_Timelines")
+TIMELINE_HEADER = ["participant_id", "session", "phase", "task", "start_unix", "end_unix",
+                   "start_session_s", "end_session_s"]
+
+
+class Timeline:
+    # One row per screen/block the participant sees, stamped with wall-clock
+    # time so device recordings (which log their own wall clock) can be cut
+    # into epochs afterwards, and with the session timebase shared by the
+    # runner and every task (clock_sync.session_time).
+    def __init__(self, participant_id, session, folder=TIMELINE_DIR, snirf_path=None, station=None):
+        os.makedirs(folder, exist_ok=True)
+        self.participant_id = participant_id
+        self.session = session
+        self.snirf_path = snirf_path
+        self.station = station
+        self.manifest_path = os.path.join(folder, f"{participant_id}_manifest.jsonl")
+        self.path = os.path.join(folder, f"{participant_id}_session_timeline.csv")
+        if not os.path.exists(self.path):
+            with open(self.path, "w", newline="") as f:
+                csv.writer(f).writerow(TIMELINE_HEADER)
+        # a timeline started by an older version keeps its own columns
+        with open(self.path, newline="") as f:
+            self.columns = next(csv.reader(f))
+
+    def record(self, phase, task, start, end, start_session=None, end_session=None):
+        # appended row by row so a crash still leaves every finished block on disk
+        row = {"participant_id": self.participant_id, "session": self.session, "phase": phase, "task": task,
+               "start_unix": f"{start:.6f}", "end_unix": f"{end:.6f}",
+               "start_session_s": "" if start_session is None else f"{start_session:.6f}",
+               "end_session_s": "" if end_session is None else f"{end_session:.6f}"}
+        with open(self.path, "a", newline="") as f:
+            csv.DictWriter(f, self.columns, extrasaction="ignore").writerow(row)
+        # task blocks are stimulus conditions in their own right; other phases group by phase
+        name = task if phase == "task" else phase
+        snirf_events.append_events(self.snirf_path, self.participant_id, name, [[start, end - start, 1]])
+        if self.station:
+            self.station.send("timeline", session=self.session, phase=phase, task=task,
+                              start_unix=start, end_unix=end, start_session_s=start_session,
+                              end_session_s=end_session)
+
+    @contextmanager
+    def block(self, phase, task=""):
+        if self.station:
+            self.station.heartbeat(phase, task)
+        sampling_profiler.set_phase(phase)
+        start, start_session = time.time(), clock_sync.session_time()
+        yield
+        self.record(phase, task, start, time.time(), start_session, clock_sync.session_time())
+
+
+def load_timeline(path):
+    with open(path, newline="") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        row["start_unix"] = float(row["start_unix"])
+        row["end_unix"] = float(row["end_unix"])
+        for key in ("start_session_s", "end_session_s"):
+            row[key] = float(row[key]) if row.get(key) else None
+    return rows
@@ -0,0 +1,99 @@
+import os
+import time
+from datetime import datetime, timezone
+
+try:
+    import h5py
+    import numpy as np
+except ImportError:
+    h5py = None
+
+# Stimulus annotations in SNIRF layout (/nirs/stimN with name + [onset,
+# duration, value, ...] rows). The file holds only stim groups and metadata;
+# fNIRS toolchains merge it with the device's own data1 recording. The session
+# runner exports the path as MVO_SNIRF_PATH so the task subprocesses append
+# their per-trial events to the same file.
+SNIRF_DIR = os.path.join(os.path.expanduser("~"), "OneDrive", "Desktop", "Mendi_vs_Octamon_Study", "SNIRF_Events")
+SNIRF_PATH = os.environ.get("MVO_SNIRF_PATH")
+CHUNK_ROWS = 256
+
+
+def _string(group, name, value):
+    if name not in group:
+        group.create_dataset(name, data=value, dtype=h5py.string_dtype())
+
+
+def _init_file(f, participant_id, start_unix):
+    _string(f, "formatVersion", "1.1")
+    nirs = f.require_group("nirs")
+    if "session_start_unix" not in nirs.attrs:
+        nirs.attrs["session_start_unix"] = start_unix
+    tags = nirs.require_group("metaDataTags")
+    start = datetime.fromtimestamp(nirs.attrs["session_start_unix"], tz=timezone.utc)
+    _string(tags, "SubjectID", participant_id)
+    _string(tags, "MeasurementDate", start.strftime("%Y-%m-%d"))
+    _string(tags, "MeasurementTime", start.strftime("%H:%M:%S.%fZ"))
+    _string(tags, "LengthUnit", "mm")
+    _string(tags, "TimeUnit", "s")
+    _string(tags, "FrequencyUnit", "Hz")
+    return nirs
+
+
+def _stim_group(nirs, name, labels):
+    i = 1
+    while f"stim{i}" in nirs:
+        stim = nirs[f"stim{i}"]
+        if stim["name"][()].decode() == name:
+            return stim
+        i += 1
+    stim = nirs.create_group(f"stim{i}")
+    _string(stim, "name", name)
+    # resizable, chunked and compressed so appends never rewrite earlier rows
+    stim.create_dataset("data", shape=(0, len(labels)), maxshape=(None, len(labels)),
+                        chunks=(CHUNK_ROWS, len(labels)), compression="gzip", dtype="f8")
+    stim.create_dataset("dataLabels", data=list(labels), dtype=h5py.string_dtype())
+    return stim
+
+
+def append_events(path, participant_id, name, rows, labels=("Onset", "Duration", "Amplitude")):
+    # rows carry wall-clock onsets; they are stored relative to session start
+    if h5py is None or not path or not len(rows):
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    rows = np.asarray(rows, dtype="f8").reshape(len(rows), -1)
+    with h5py.File(path, "a") as f:
+        nirs = _init_file(f, participant_id, float(rows[0, 0]))
+        rows[:, 0] -= nirs.attrs["session_start_unix"]
+        data = _stim_group(nirs, name, labels)["data"]
+        n = data.shape[0]
+        data.resize(n + len(rows), axis=0)
+        data[n:] = rows
+
+
+def session_path(participant_id):
+    if h5py is None:
+        print("⚠️ h5py not installed, SNIRF event export disabled")
+        return None
+    os.makedirs(SNIRF_DIR, exist_ok=True)
+    return os.path.join(SNIRF_DIR, f"{participant_id}_events.snirf")
+
+
+def start_session(participant_id):
+    path = session_path(participant_id)
+    if path:
+        os.environ["MVO_SNIRF_PATH"] = path
+        with h5py.File(path, "a") as f:
+            _init_file(f, participant_id, time.time())
+    return path
+
+
+def load_events(path):
+    with h5py.File(path, "r") as f:
+        nirs = f["nirs"]
+        out = {}
+        i = 1
+        while f"stim{i}" in nirs:
+            stim = nirs[f"stim{i}"]
+            out[stim["name"][()].decode()] = stim["data"][()]
+            i += 1
+        return out
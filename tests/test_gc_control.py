@@ -0,0 +1,71 @@
+import os
+import sys
+import random
+import runpy
+import subprocess
+import pytest
+
+# Records a short headless session of each task on a virtual clock (so it
+# runs as fast as the frame loop allows), then replays it under tracemalloc
+# through gc_control.check_recording, which must see a flat heap.
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TASKS = {"1-back": "oneback_game.py", "balloon": "red_balloon_shoot_game.py"}
+HEADLESS = {"SDL_VIDEODRIVER": "dummy", "SDL_AUDIODRIVER": "dummy", "MVO_SEED": "1234"}
+
+
+def record(script, out_dir):
+    # runs in a child process: fakes the clock and the participant, then runs the task live
+    import pygame
+    now = [0]
+
+    class VirtualClock:
+        def tick(self, fps=0):
+            dt = int(round(1000 / (fps or 60)))
+            now[0] += dt
+            return dt
+
+    pygame.time.Clock = VirtualClock
+    pygame.time.get_ticks = lambda: now[0]
+    real_get = pygame.event.get
+    rng = random.Random(5)
+
+    def get(*args, **kwargs):
+        events = real_get(*args, **kwargs)
+        if rng.random() < 0.03:
+            if "balloon" in script:
+                pos = (rng.randint(0, 1023), rng.randint(0, 767))
+                events.append(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button=1, pos=pos))
+            else:
+                key = rng.choice([pygame.K_LEFT, pygame.K_RIGHT])
+                events.append(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=""))
+        return events
+
+    pygame.event.get = get
+    sys.argv = [script, "T01"]
+    runpy.run_path(script, run_name="__main__")
+
+
+def run_child(args, env):
+    return subprocess.run([sys.executable, os.path.abspath(__file__)] + args, cwd=REPO, env=env,
+                          capture_output=True, text=True, timeout=900)
+
+
+@pytest.mark.parametrize("task", sorted(TASKS))
+def test_frame_loop_does_not_allocate(task, tmp_path):
+    env = dict(os.environ, MVO_OUTPUT_DIR=str(tmp_path), PYTHONPATH=REPO, **HEADLESS)
+    rec = run_child(["record", os.path.join(REPO, TASKS[task])], env)
+    assert rec.returncode == 0, rec.stdout + rec.stderr
+    recordings = [p for p in os.listdir(tmp_path) if p.endswith("_inputs.jsonl")]
+    assert len(recordings) == 1, os.listdir(tmp_path)
+    check = run_child(["check", str(tmp_path / recordings[0])], env)
+    assert check.returncode == 0, check.stdout + check.stderr
+    assert "✅" in check.stdout
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, REPO)
+    if sys.argv[1] == "record":
+        record(sys.argv[2], os.environ["MVO_OUTPUT_DIR"])
+    else:
+        import gc_control
+        sys.exit(0 if gc_control.check_recording(sys.argv[2]) else 1)
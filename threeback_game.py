@@ -5,6 +5,16 @@ import os
 import time
 import sys
 import string
+import frame_timing
+import render_backend
+import input_tape
+import snirf_events
+import session_manifest
+import gc_control
+import realtime_mode
+import nback_sequences
+import sampling_profiler
+import clock_sync
 
 # Override default ID if passed via CLI
 if len(sys.argv) > 1:
@@ -14,10 +24,8 @@ else:
 
 # Initialize Pygame and set full screen
 pygame.init()
-screen = pygame.display.set_mode((0, 0), pygame.FULLSCREEN)
-WIDTH, HEIGHT = screen.get_size()
-pygame.display.set_caption("3-Back Game (Full Screen)")
-clock = pygame.time.Clock()
+display = render_backend.open_display("3-Back Game (Full Screen)")
+WIDTH, HEIGHT = display.size
 
 # Settings
 FPS = 60
@@ -27,9 +35,11 @@ FADE_DURATION_MS = 20         # Fade duration (ms)
 TOTAL_TRIALS = 75             # 3 warm-ups + 60 scored trials
 TOTAL_DURATION_SEC = 150      # ~2 minutes 6 seconds to allow 63 letters
 MATCH_RATIO = 0.3             # 30% matches
+LURES = {1: 0, 2: 0}          # exact 1-/2-back lure counts (MVO_SEQUENCES only)
+clock = frame_timing.FrameClock(FPS, display)
 
 # Prepare save directory and path
-BASE_SAVE_DIR = os.path.join(
+BASE_SAVE_DIR = os.environ.get("MVO_OUTPUT_DIR") or os.path.join(
     os.path.expanduser("~"),
     "OneDrive", "Desktop", "Mendi_vs_Octamon_Study", "Three_back_performance"
 )
@@ -44,6 +54,9 @@ def get_unique_save_path(base_dir, participant_id, task_name):
     return full_path
 
 SAVE_PATH = get_unique_save_path(BASE_SAVE_DIR, PARTICIPANT_ID, "3-back_performance")
+TRIALS_PATH = SAVE_PATH[:-len(".csv")] + "_trials.csv"
+# Seeds the RNG, so it must be opened before the sequence is generated
+tape = input_tape.open_tape(SAVE_PATH[:-len(".csv")] + "_inputs.jsonl", "3-back", display.size)
 
 # Colors & Fonts
 WHITE, BLACK = (255, 255, 255), (0, 0, 0)
@@ -69,20 +82,16 @@ no_match_btn = pygame.Rect(x0, HEIGHT - btn_h - 40, btn_w, btn_h)
 match_btn    = pygame.Rect(x0 + btn_w + spacing, HEIGHT - btn_h - 40, btn_w, btn_h)
 
 def draw_text(text, font, color, x, y, alpha=255):
-    surf = font.render(text, True, color)
-    if alpha < 255:
-        surf.set_alpha(alpha)
-    rect = surf.get_rect(center=(x, y))
-    screen.blit(surf, rect)
+    display.text(text, font, color, (x, y), alpha)
 
 def draw_buttons(highlight):
     left_color  = DARK_PURPLE if highlight == "left" else PURPLE
     right_color = DARK_BLUE   if highlight == "right" else BLUE
-    pygame.draw.rect(screen, left_color,  no_match_btn, border_radius=15)
-    pygame.draw.rect(screen, WHITE,       no_match_btn, 3, border_radius=15)
+    display.rect(left_color,  no_match_btn, radius=15)
+    display.rect(WHITE,       no_match_btn, 3, radius=15)
     draw_text("NO MATCH", FONT_BUTTON, WHITE, no_match_btn.centerx, no_match_btn.centery)
-    pygame.draw.rect(screen, right_color, match_btn,    border_radius=15)
-    pygame.draw.rect(screen, WHITE,       match_btn,    3, border_radius=15)
+    display.rect(right_color, match_btn,    radius=15)
+    display.rect(WHITE,       match_btn,    3, radius=15)
     draw_text("MATCH",    FONT_BUTTON, WHITE, match_btn.centerx,    match_btn.centery)
 
 def generate_matches(n, ratio):
@@ -102,13 +111,16 @@ def generate_matches(n, ratio):
                 flags.append(False)
     return flags
 
+# Letters minus each letter, built once instead of per trial
+OPTIONS_WITHOUT = {x: [l for l in string.ascii_uppercase if l != x] for x in string.ascii_uppercase}
+
 def generate_sequence(matches):
     seq = []
     letters = string.ascii_uppercase
     for i, is_match in enumerate(matches):
         if i < 3 or not is_match:
             if i >= 3:
-                opts = [l for l in letters if l != seq[i-3]]
+                opts = OPTIONS_WITHOUT[seq[i-3]]
             else:
                 opts = letters
             seq.append(random.choice(opts))
@@ -116,8 +128,11 @@ def generate_sequence(matches):
             seq.append(seq[i-3])
     return seq
 
-to_match = generate_matches(TOTAL_TRIALS, MATCH_RATIO)
-sequence = generate_sequence(to_match)
+if nback_sequences.MODE:
+    sequence, to_match = nback_sequences.draw(3, TOTAL_TRIALS, MATCH_RATIO, LURES)
+else:
+    to_match = generate_matches(TOTAL_TRIALS, MATCH_RATIO)
+    sequence = generate_sequence(to_match)
 
 def save_summary(correct, incorrect, reaction_times, total_trials):
     missed = total_trials - (correct + incorrect)
@@ -138,25 +153,75 @@ def save_summary(correct, incorrect, reaction_times, total_trials):
     except Exception as e:
         print(f"❌ Failed to save results: {e}")
 
+def save_trials(trials):
+    try:
+        with open(TRIALS_PATH, 'w', newline='') as f:
+            w = csv.writer(f)
+            w.writerow(["trial", "letter", "is_match", "response", "reaction_time_ms", "stimulus_frames", "stimulus_ms", "onset_unix", "onset_session_s"])
+            for row in trials:
+                w.writerow(row)
+        print(f"✅ 3-back trial log saved to: {TRIALS_PATH}")
+    except Exception as e:
+        print(f"❌ Failed to save trial log: {e}")
+    events = []
+    for idx, letter, is_match, resp, rt, frames, stim_ms, onset_unix, onset_session in trials:
+        duration = (stim_ms if stim_ms != "" else LETTER_DISPLAY_MS) / 1000
+        events.append([onset_unix, duration, is_match, -1 if resp == "" else resp, float("nan") if rt == "" else rt])
+    snirf_events.append_events(snirf_events.SNIRF_PATH, PARTICIPANT_ID, "3-back_trials", events,
+                               ("Onset", "Duration", "Amplitude", "Response", "ReactionTime"))
+
+def close_trial(trials, idx, response, rt, shown_frames, onset, offset, onset_unix, onset_session):
+    # onset/offset are the flip timestamps of the first frame with and without the letter
+    if onset is not None and offset is not None:
+        stim_ms = round((offset - onset) * 1000, 2)
+    else:
+        stim_ms = ""
+    resp = "" if response is None else int(response)
+    trials.append([idx, sequence[idx], int(to_match[idx]), resp, "" if rt is None else rt, shown_frames, stim_ms, onset_unix,
+                   "" if onset_session is None else round(onset_session, 6)])
+
 def run_game():
     correct = incorrect = 0
     reaction_times = []
+    trials = []
     idx = 0
     response = None
     rt = None
 
-    start_time = pygame.time.get_ticks()
+    vsync = frame_timing.VSYNC_MODE
+    if vsync:
+        sampling_profiler.set_phase("calibration")
+        clock.period_ms = tape.sample("p", lambda: clock.calibrate(BLACK))
+        vsync = frame_timing.refresh_plausible(clock.period_ms)
+    if vsync:
+        trial_len = clock.frames(TRIAL_DURATION_MS)
+        letter_len = clock.frames(LETTER_DISPLAY_MS)
+        fade_len = clock.frames(FADE_DURATION_MS)
+    else:
+        trial_len = TRIAL_DURATION_MS
+        letter_len = LETTER_DISPLAY_MS
+        fade_len = FADE_DURATION_MS
+    frame = 0
+    shown_frames = 0
+    onset = None
+    offset = None
+
+    start_time = tape.ticks()
+    trial_unix = tape.sample("w", time.time)
+    trial_session = tape.sample("s", clock_sync.session_time)
     react_clock = start_time
 
     running = True
+    sampling_profiler.set_phase("trial")
     while running:
         if idx >= TOTAL_TRIALS:
             break
 
-        now = pygame.time.get_ticks()
+        now = tape.ticks()
         elapsed = now - start_time
+        progress = frame if vsync else elapsed
 
-        if elapsed >= TRIAL_DURATION_MS:
+        if progress >= trial_len:
             if idx >= 3:
                 if response is not None:
                     if response == to_match[idx]:
@@ -165,49 +230,74 @@ def run_game():
                         incorrect += 1
                     if rt is not None:
                         reaction_times.append(rt)
+            close_trial(trials, idx, response, rt, shown_frames, onset, offset, trial_unix, trial_session)
             idx += 1
             response = None
             rt = None
             start_time = now
             react_clock = now
+            trial_unix = tape.sample("w", time.time)
+            trial_session = tape.sample("s", clock_sync.session_time)
+            frame = 0
+            shown_frames = 0
+            onset = None
+            offset = None
             if idx >= TOTAL_TRIALS:
                 break
 
-        screen.fill(BLACK)
-        draw_text("3-Back Game", FONT_MEDIUM, PURPLE, WIDTH//2, 60)
+        phase = frame if vsync else tape.ticks() - start_time
+        alpha = frame_timing.stimulus_alpha(phase, letter_len, fade_len)
 
-        phase = pygame.time.get_ticks() - start_time
-        if phase < LETTER_DISPLAY_MS:
-            draw_text(sequence[idx], FONT_LARGE, WHITE, WIDTH//2, HEIGHT//2)
-        elif phase < LETTER_DISPLAY_MS + FADE_DURATION_MS:
-            fade = phase - LETTER_DISPLAY_MS
-            alpha = max(0, 255 - int(255 * fade / FADE_DURATION_MS))
-            draw_text(sequence[idx], FONT_LARGE, WHITE, WIDTH//2, HEIGHT//2, alpha)
+        # replays skip drawing unless MVO_REPLAY_RENDER=1
+        if tape.rendering:
+            display.clear(BLACK)
+            draw_text("3-Back Game", FONT_MEDIUM, PURPLE, WIDTH//2, 60)
+            if alpha > 0:
+                draw_text(sequence[idx], FONT_LARGE, WHITE, WIDTH//2, HEIGHT//2, alpha)
 
-        hl = None
-        if idx >= 3 and response is not None:
-            hl = "right" if response else "left"
-        draw_buttons(hl)
+            hl = None
+            if idx >= 3 and response is not None:
+                hl = "right" if response else "left"
+            draw_buttons(hl)
 
-        pygame.display.flip()
+        flipped = tape.flip(clock.flip)
+        if alpha > 0:
+            shown_frames += 1
+            if onset is None:
+                onset = flipped
+        elif onset is not None and offset is None:
+            offset = flipped
+        frame += 1
 
-        for ev in pygame.event.get():
+        for ev in tape.events():
             if ev.type == pygame.QUIT:
                 running = False
             elif idx >= 3 and response is None and ev.type == pygame.KEYDOWN:
                 if ev.key == pygame.K_LEFT:
                     response = False
-                    rt = pygame.time.get_ticks() - react_clock
+                    rt = tape.ticks() - react_clock
                 elif ev.key == pygame.K_RIGHT:
                     response = True
-                    rt = pygame.time.get_ticks() - react_clock
+                    rt = tape.ticks() - react_clock
 
-        clock.tick(FPS)
+        tape.sample("d", clock.tick)
 
+    sampling_profiler.set_phase("saving")
     # scored trials = total - 3 warmups
     total_scored = max(0, idx - 3)
     save_summary(correct, incorrect, reaction_times, total_scored)
+    save_trials(trials)
+    tape.close()
+    session_manifest.record_outputs("3-back", summary=SAVE_PATH, trials=TRIALS_PATH,
+                                    inputs=getattr(tape, "path", None), seed=tape.seed,
+                                    first_onset_unix=trials[0][7] if trials else None)
     pygame.quit()
 
 if __name__ == "__main__":
-    run_game()
+    profiler = sampling_profiler.start(SAVE_PATH[:-len(".csv")])
+    realtime_mode.enable("3-back")
+    gc_control.after_setup()
+    with gc_control.timed_block():
+        run_game()
+    if profiler:
+        profiler.stop()
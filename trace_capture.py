@@ -0,0 +1,95 @@
+import queue
+import threading
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Per-frame trace of the balloon game: cursor position (relative to the game
+# field), line position (pixels below the top mark, as in line_pos_pixels) and
+# balloons on screen. Rows go into two preallocated ring buffers; a full buffer
+# is handed to a writer thread and appended raw to <results>_trace.bin while
+# the frame loop carries on in the other one. Read it back with load_trace().
+TRACE_DTYPE = None if np is None else np.dtype([
+    ("t_ms", "<f8"), ("x", "<i2"), ("y", "<i2"), ("line_pos", "<f4"), ("active", "<u2"), ("red", "<u2"),
+])
+BUFFER_ROWS = 2048   # ~34 s at 60 fps per spill
+
+
+class TraceRecorder:
+    def __init__(self, path, rows=BUFFER_ROWS):
+        self.path = path
+        self.f = open(path, "wb")
+        self.buffers = [np.zeros(rows, TRACE_DTYPE), np.zeros(rows, TRACE_DTYPE)]
+        self.free = queue.Queue()
+        self.free.put(self.buffers[1])
+        self.full = queue.Queue()
+        self.buf = self.buffers[0]
+        self.n = 0
+        self.rows_written = 0
+        self.writer = threading.Thread(target=self._write_loop, daemon=True)
+        self.writer.start()
+
+    def _write_loop(self):
+        while True:
+            item = self.full.get()
+            if item is None:
+                return
+            buf, n = item
+            buf[:n].tofile(self.f)
+            self.free.put(buf)
+
+    def record(self, t_ms, x, y, line_pos, active, red):
+        self.buf[self.n] = (t_ms, x, y, line_pos, active, red)
+        self.n += 1
+        if self.n == len(self.buf):
+            self._spill()
+
+    def _spill(self):
+        self.full.put((self.buf, self.n))
+        self.rows_written += self.n
+        # only blocks if the writer is a whole buffer behind
+        self.buf = self.free.get()
+        self.n = 0
+
+    def close(self):
+        if self.n:
+            self._spill()
+        self.full.put(None)
+        self.writer.join()
+        self.f.close()
+        print(f"🖱️ Trace of {self.rows_written} frames saved to: {self.path}")
+
+
+def open_trace(path):
+    if np is None:
+        print("⚠️ numpy not installed, cursor/line trace disabled")
+        return None
+    return TraceRecorder(path)
+
+
+def load_trace(path):
+    return np.fromfile(path, dtype=TRACE_DTYPE)
+
+
+def downsample(trace, rate_hz, duration_ms=None):
+    # Fixed-rate bins from the (irregular) frame samples: cursor and line are
+    # bin means, balloon counts the bin maximum. Bins without a frame are NaN.
+    t = trace["t_ms"]
+    if duration_ms is None:
+        duration_ms = t[-1] if len(t) else 0
+    step = 1000.0 / rate_hz
+    n_bins = int(np.ceil(duration_ms / step)) or 1
+    bins = np.minimum((t / step).astype(np.int64), n_bins - 1)
+    counts = np.bincount(bins, minlength=n_bins)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = {"t_s": np.arange(n_bins) * step / 1000.0}
+        for name in ("x", "y", "line_pos"):
+            out[name] = np.bincount(bins, weights=trace[name], minlength=n_bins) / counts
+    for name in ("active", "red"):
+        peak = np.zeros(n_bins)
+        np.maximum.at(peak, bins, trace[name])
+        peak[counts == 0] = np.nan
+        out[name] = peak
+    return out